@@ -3,578 +3,210 @@ FastAPI Backend for Support Ticket Agent
 Save as: api.py
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, ConfigDict, Field, StringConstraints, field_validator
+import atexit
 import logging
-from typing import Optional
-import sys
+import logging.handlers
+import queue
+from typing import Annotated, Optional
+from contextlib import asynccontextmanager
+import asyncio
 import os
 
-# Add src to path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from classifier import classification_cache_info
+from src.graph import get_support_graph
+from src.groq_client import aclose_groq_client
+from src.state import INITIAL_STATE_TEMPLATE, SupportTicketState
 
-from src.graph import create_support_graph
-from src.state import SupportTicketState
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Initialize FastAPI
-app = FastAPI(
-    title="Support Ticket Agent API",
-    description="AI-powered support ticket resolution system",
-    version="1.0.0"
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Initialize graph once at startup
-graph = None
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize the LangGraph on startup"""
-    global graph
-    try:
-        logger.info("Initializing Support Ticket Agent graph...")
-        graph = create_support_graph()
-        logger.info("Graph initialized successfully!")
-    except Exception as e:
-        logger.error(f"Failed to initialize graph: {str(e)}")
-        raise
-
-
-# Request/Response Models
-class TicketRequest(BaseModel):
-    subject: str
-    description: str
-
-class TicketResponse(BaseModel):
-    success: bool
-    classification: Optional[str] = None
-    escalated: bool = False
-    review_passed: bool = False
-    attempts: int = 1
-    final_response: Optional[str] = None
-    escalation_message: Optional[str] = None
-    error: Optional[str] = None
-
-
-def create_initial_state(subject: str, description: str) -> SupportTicketState:
-    """Create initial state for the graph"""
-    return {
-        "subject": subject,
-        "description": description,
-        "classification": None,
-        "retrieved_context": None,
-        "formatted_context": None,
-        "retrieval_attempt": 1,
-        "draft_response": None,
-        "review_passed": None,
-        "reviewer_feedback": None,
-        "draft_attempt": 1,
-        "max_attempts_reached": None,
-        "escalated": None,
-    }
-
-
-@app.post("/api/process-ticket", response_model=TicketResponse)
-async def process_ticket(ticket: TicketRequest):
+def _install_queue_logging():
     """
-    Process a support ticket through the AI agent
+    Configure logging: handlers on the request path only enqueue records, a
+    background listener thread does the actual writing to stderr
     """
-    try:
-        logger.info(f"Processing ticket: {ticket.subject}")
-        
-        # Validate input
-        if not ticket.subject.strip() or not ticket.description.strip():
-            raise HTTPException(
-                status_code=400, 
-                detail="Subject and description are required"
-            )
-        
-        # Create initial state
-        initial_state = create_initial_state(
-            ticket.subject,
-            ticket.description
-        )
-        
-        # Run the graph
-        final_state = graph.invoke(initial_state)
-        
-        # Build response
-        response = TicketResponse(
-            success=True,
-            classification=final_state.get('classification'),
-            escalated=final_state.get('escalated', False),
-            review_passed=final_state.get('review_passed', False),
-            attempts=final_state.get('draft_attempt', 1),
-            final_response=final_state.get('draft_response'),
-            escalation_message=final_state.get('escalation_message')
-        )
-        
-        logger.info(f"Ticket processed successfully: {response.classification}")
-        return response
-        
-    except Exception as e:
-        logger.error(f"Error processing ticket: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to process ticket: {str(e)}"
-        )
-
-
-@app.get("/api/health")
-async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "graph_initialized": graph is not None
-    }
-
-
-@app.get("/")
-async def root():
-    """Root endpoint"""
-    return {
-        "message": "Support Ticket Agent API",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
-
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "api:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
-
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import logging
-from typing import Optional
-import sys
-import os
-
-# Add src to path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-
-from src.graph import create_support_graph
-from src.state import SupportTicketState
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.INFO)
+    
+    # `python api.py` imports this file twice (as __main__, then as api for
+    # uvicorn), so only the first import installs the handler
+    if any(isinstance(handler, logging.handlers.QueueHandler) for handler in root_logger.handlers):
+        return
+    
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler()
+    stream_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    log_listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    log_listener.start()
+    # Stopped at interpreter exit rather than in lifespan, so logs from a
+    # second lifespan (reload, TestClient) are still written
+    atexit.register(log_listener.stop)
+    root_logger.addHandler(logging.handlers.QueueHandler(log_queue))
+
+
+_install_queue_logging()
 logger = logging.getLogger(__name__)
 
-# Initialize FastAPI
-app = FastAPI(
-    title="Support Ticket Agent API",
-    description="AI-powered support ticket resolution system",
-    version="1.0.0"
-)
+# Micro-batching settings: tickets arriving within MAX_WAIT_MS of each other
+# are dispatched together through graph.abatch(), up to MAX_BATCH at a time
+MAX_BATCH = int(os.getenv("MAX_BATCH", "32"))
+MAX_WAIT_MS = int(os.getenv("MAX_WAIT_MS", "10"))
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Upper bound on tickets being processed at once; requests beyond this wait
+# for a slot instead of piling more concurrent LLM calls onto the backend
+MAX_INFLIGHT = int(os.getenv("MAX_INFLIGHT", "64"))
 
-# Initialize graph once at startup
-graph = None
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize the LangGraph on startup"""
-    global graph
+async def run_batch(graph, batch: list):
+    """Run one batch through the graph and resolve each ticket's future"""
+    states = [state for state, _ in batch]
+    logger.info("Dispatching batch of %d ticket(s)", len(states))
+    
     try:
-        logger.info("Initializing Support Ticket Agent graph...")
-        graph = create_support_graph()
-        logger.info("Graph initialized successfully!")
+        results = await graph.abatch(states, return_exceptions=True)
     except Exception as e:
-        logger.error(f"Failed to initialize graph: {str(e)}")
-        raise
-
-
-# Request/Response Models
-class TicketRequest(BaseModel):
-    subject: str
-    description: str
-
-class TicketResponse(BaseModel):
-    success: bool
-    classification: Optional[str] = None
-    escalated: bool = False
-    review_passed: bool = False
-    attempts: int = 1
-    final_response: Optional[str] = None
-    escalation_message: Optional[str] = None
-    error: Optional[str] = None
-
-
-def create_initial_state(subject: str, description: str) -> SupportTicketState:
-    """Create initial state for the graph"""
-    return {
-        "subject": subject,
-        "description": description,
-        "classification": None,
-        "retrieved_context": None,
-        "formatted_context": None,
-        "retrieval_attempt": 1,
-        "draft_response": None,
-        "review_passed": None,
-        "reviewer_feedback": None,
-        "draft_attempt": 1,
-        "max_attempts_reached": None,
-        "escalated": None,
-    }
-
-
-@app.post("/api/process-ticket", response_model=TicketResponse)
-async def process_ticket(ticket: TicketRequest):
-    """
-    Process a support ticket through the AI agent
-    """
-    try:
-        logger.info(f"Processing ticket: {ticket.subject}")
-        
-        # Validate input
-        if not ticket.subject.strip() or not ticket.description.strip():
-            raise HTTPException(
-                status_code=400, 
-                detail="Subject and description are required"
-            )
-        
-        # Create initial state
-        initial_state = create_initial_state(
-            ticket.subject,
-            ticket.description
-        )
-        
-        # Run the graph
-        final_state = graph.invoke(initial_state)
+        results = [e] * len(batch)
+    
+    for (_, future), result in zip(batch, results):
+        # The client may have disconnected while the batch was running
+        if future.done():
+            continue
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+
+
+async def batch_worker(graph, ticket_queue: asyncio.Queue):
+    """Drain queued tickets into batches and run them through the graph"""
+    loop = asyncio.get_running_loop()
+    running = set()
+    
+    while True:
+        batch = [await ticket_queue.get()]
+        deadline = loop.time() + MAX_WAIT_MS / 1000
         
-        # Build response
-        response = TicketResponse(
-            success=True,
-            classification=final_state.get('classification'),
-            escalated=final_state.get('escalated', False),
-            review_passed=final_state.get('review_passed', False),
-            attempts=final_state.get('draft_attempt', 1),
-            final_response=final_state.get('draft_response'),
-            escalation_message=final_state.get('escalation_message')
-        )
+        # Keep collecting until the batch is full or the window closes
+        while len(batch) < MAX_BATCH:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(ticket_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
         
-        logger.info(f"Ticket processed successfully: {response.classification}")
-        return response
-        
-    except Exception as e:
-        logger.error(f"Error processing ticket: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to process ticket: {str(e)}"
-        )
-
-
-@app.get("/api/health")
-async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "graph_initialized": graph is not None
-    }
-
-
-@app.get("/")
-async def root():
-    """Root endpoint"""
-    return {
-        "message": "Support Ticket Agent API",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
-
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "api:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
-
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import logging
-from typing import Optional
-import sys
-import os
-
-# Add src to path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
-
-from src.graph import create_support_graph
-from src.state import SupportTicketState
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Initialize FastAPI
-app = FastAPI(
-    title="Support Ticket Agent API",
-    description="AI-powered support ticket resolution system",
-    version="1.0.0"
-)
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+        # Run batches concurrently; the in-flight semaphore in process_ticket
+        # bounds how many tickets can be queued across all of them
+        task = asyncio.create_task(run_batch(graph, batch))
+        running.add(task)
+        task.add_done_callback(running.discard)
 
-# Initialize graph once at startup
-graph = None
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize the LangGraph on startup"""
-    global graph
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize the LangGraph and the batching worker, stop it on shutdown"""
     try:
+        # Build the graph before serving so the first request doesn't pay for compilation
         logger.info("Initializing Support Ticket Agent graph...")
-        graph = create_support_graph()
+        app.state.graph = get_support_graph()
         logger.info("Graph initialized successfully!")
     except Exception as e:
-        logger.error(f"Failed to initialize graph: {str(e)}")
+        logger.error("Failed to initialize graph: %s", e)
         raise
-
-
-# Request/Response Models
-class TicketRequest(BaseModel):
-    subject: str
-    description: str
-
-class TicketResponse(BaseModel):
-    success: bool
-    classification: Optional[str] = None
-    escalated: bool = False
-    review_passed: bool = False
-    attempts: int = 1
-    final_response: Optional[str] = None
-    escalation_message: Optional[str] = None
-    error: Optional[str] = None
-
-
-def create_initial_state(subject: str, description: str) -> SupportTicketState:
-    """Create initial state for the graph"""
-    return {
-        "subject": subject,
-        "description": description,
-        "classification": None,
-        "retrieved_context": None,
-        "formatted_context": None,
-        "retrieval_attempt": 1,
-        "draft_response": None,
-        "review_passed": None,
-        "reviewer_feedback": None,
-        "draft_attempt": 1,
-        "max_attempts_reached": None,
-        "escalated": None,
-    }
-
-
-@app.post("/api/process-ticket", response_model=TicketResponse)
-async def process_ticket(ticket: TicketRequest):
-    """
-    Process a support ticket through the AI agent
-    """
-    try:
-        logger.info(f"Processing ticket: {ticket.subject}")
-        
-        # Validate input
-        if not ticket.subject.strip() or not ticket.description.strip():
-            raise HTTPException(
-                status_code=400, 
-                detail="Subject and description are required"
-            )
-        
-        # Create initial state
-        initial_state = create_initial_state(
-            ticket.subject,
-            ticket.description
-        )
-        
-        # Run the graph
-        final_state = graph.invoke(initial_state)
-        
-        # Build response
-        response = TicketResponse(
-            success=True,
-            classification=final_state.get('classification'),
-            escalated=final_state.get('escalated', False),
-            review_passed=final_state.get('review_passed', False),
-            attempts=final_state.get('draft_attempt', 1),
-            final_response=final_state.get('draft_response'),
-            escalation_message=final_state.get('escalation_message')
+    
+    app.state.inflight = asyncio.Semaphore(MAX_INFLIGHT)
+    app.state.ticket_queue = None
+    batcher_task = None
+    if MAX_BATCH > 1:
+        app.state.ticket_queue = asyncio.Queue()
+        batcher_task = asyncio.create_task(
+            batch_worker(app.state.graph, app.state.ticket_queue)
         )
-        
-        logger.info(f"Ticket processed successfully: {response.classification}")
-        return response
-        
-    except Exception as e:
-        logger.error(f"Error processing ticket: {str(e)}")
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to process ticket: {str(e)}"
-        )
-
-
-@app.get("/api/health")
-async def health_check():
-    """Health check endpoint"""
-    return {
-        "status": "healthy",
-        "graph_initialized": graph is not None
-    }
-
-
-@app.get("/")
-async def root():
-    """Root endpoint"""
-    return {
-        "message": "Support Ticket Agent API",
-        "version": "1.0.0",
-        "docs": "/docs"
-    }
-
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(
-        "api:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
-    )
-
-from fastapi import FastAPI, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import logging
-from typing import Optional
-import sys
-import os
-
-# Add src to path
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+        logger.info("Batch worker started (max_batch=%d, max_wait_ms=%d)", MAX_BATCH, MAX_WAIT_MS)
+    
+    yield
+    
+    if batcher_task is not None:
+        batcher_task.cancel()
+    # Close the pooled Groq connections opened on this event loop
+    await aclose_groq_client()
 
-from src.graph import create_support_graph
-from src.state import SupportTicketState
-
-# Configure logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
 
 # Initialize FastAPI
 app = FastAPI(
     title="Support Ticket Agent API",
     description="AI-powered support ticket resolution system",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# CORS middleware
+# CORS middleware - comma-separated allowed origins, e.g.
+# CORS_ORIGINS=https://app.example.com,http://localhost:3000
+CORS_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+    if origin.strip()
+]
+
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, replace with specific origins
+    allow_origins=CORS_ORIGINS,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],
+    allow_headers=["content-type"],
 )
 
-# Initialize graph once at startup
-graph = None
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize the LangGraph on startup"""
-    global graph
-    try:
-        logger.info("Initializing Support Ticket Agent graph...")
-        graph = create_support_graph()
-        logger.info("Graph initialized successfully!")
-    except Exception as e:
-        logger.error(f"Failed to initialize graph: {str(e)}")
-        raise
+# Request/Response Models
+NonBlankStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
 
 
-# Request/Response Models
 class TicketRequest(BaseModel):
-    subject: str
-    description: str
+    model_config = ConfigDict(extra='forbid', frozen=True, validate_assignment=False)
+    
+    subject: NonBlankStr
+    description: NonBlankStr
 
 class TicketResponse(BaseModel):
+    # Built straight from the final graph state; the validation aliases map
+    # state keys onto response fields and unrelated state keys are ignored
+    model_config = ConfigDict(extra='ignore', populate_by_name=True)
+    
     success: bool
     classification: Optional[str] = None
     escalated: bool = False
     review_passed: bool = False
-    attempts: int = 1
-    final_response: Optional[str] = None
+    attempts: int = Field(1, validation_alias="draft_attempt")
+    final_response: Optional[str] = Field(None, validation_alias="draft_response")
     escalation_message: Optional[str] = None
     error: Optional[str] = None
+    
+    @field_validator("escalated", "review_passed", mode="before")
+    @classmethod
+    def _unset_as_false(cls, value):
+        # These flags stay None in the state until a node sets them
+        return bool(value)
 
 
 def create_initial_state(subject: str, description: str) -> SupportTicketState:
     """Create initial state for the graph"""
-    return {
-        "subject": subject,
-        "description": description,
-        "classification": None,
-        "retrieved_context": None,
-        "formatted_context": None,
-        "retrieval_attempt": 1,
-        "draft_response": None,
-        "review_passed": None,
-        "reviewer_feedback": None,
-        "draft_attempt": 1,
-        "max_attempts_reached": None,
-        "escalated": None,
-    }
+    state = INITIAL_STATE_TEMPLATE.copy()
+    state["subject"] = subject
+    state["description"] = description
+    return state
 
 
 @app.post("/api/process-ticket", response_model=TicketResponse)
-async def process_ticket(ticket: TicketRequest):
+async def process_ticket(request: Request, ticket: TicketRequest):
     """
     Process a support ticket through the AI agent
     """
     try:
-        logger.info(f"Processing ticket: {ticket.subject}")
-        
-        # Validate input
-        if not ticket.subject.strip() or not ticket.description.strip():
-            raise HTTPException(
-                status_code=400, 
-                detail="Subject and description are required"
-            )
+        logger.info("Processing ticket: %s", ticket.subject)
         
         # Create initial state
         initial_state = create_initial_state(
@@ -582,37 +214,41 @@ async def process_ticket(ticket: TicketRequest):
             ticket.description
         )
         
-        # Run the graph
-        final_state = graph.invoke(initial_state)
+        # Run the graph without blocking the event loop. With batching
+        # disabled (MAX_BATCH <= 1) skip the queue and invoke directly.
+        ticket_queue = request.app.state.ticket_queue
+        async with request.app.state.inflight:
+            if ticket_queue is None:
+                final_state = await request.app.state.graph.ainvoke(initial_state)
+            else:
+                future = asyncio.get_running_loop().create_future()
+                await ticket_queue.put((initial_state, future))
+                final_state = await future
         
         # Build response
-        response = TicketResponse(
-            success=True,
-            classification=final_state.get('classification'),
-            escalated=bool(final_state.get('escalated', False)),
-            review_passed=final_state.get('review_passed', False),
-            attempts=final_state.get('draft_attempt', 1),
-            final_response=final_state.get('draft_response'),
-            escalation_message=final_state.get('escalation_message')
-        )
+        response = TicketResponse.model_validate({**final_state, "success": True})
         
-        logger.info(f"Ticket processed successfully: {response.classification}")
+        logger.info("Ticket processed successfully: %s", response.classification)
         return response
         
     except Exception as e:
-        logger.error(f"Error processing ticket: {str(e)}")
-        raise HTTPException(
+        logger.error("Error processing ticket: %s", e)
+        # Same body an HTTPException would produce, without raising through
+        # FastAPI's exception handlers
+        return ORJSONResponse(
             status_code=500,
-            detail=f"Failed to process ticket: {str(e)}"
+            content={"detail": f"Failed to process ticket: {str(e)}"}
         )
 
 
 @app.get("/api/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "graph_initialized": graph is not None
+        "graph_initialized": getattr(request.app.state, "graph", None) is not None,
+        # hits, misses, maxsize and currsize of the memoized classifier
+        "classification_cache": classification_cache_info()._asdict()
     }
 
 
@@ -628,9 +264,19 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
+    
+    # Auto-reload (DEV) only works with a single worker. Otherwise each
+    # worker builds its own graph at startup; the graph is stateless so
+    # there is nothing to share between processes.
+    dev = bool(os.getenv("DEV"))
     uvicorn.run(
         "api:app",
         host="0.0.0.0",
         port=8000,
-        reload=True
+        reload=dev,
+        workers=1 if dev else int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)),
+        # "auto" uses uvloop and httptools when they are installed (uvloop is
+        # not on Windows) and falls back to asyncio and h11 otherwise
+        loop="auto",
+        http="auto"
     )
\ No newline at end of file
@@ -4,11 +4,23 @@ This classifier sorts support tickets into 4 categories based on keywords
 """
 
 import logging
-from typing import Dict, List
+import sys
+from functools import lru_cache
+from typing import Dict, Iterator, List, Tuple
 from src.models import TicketCategory
 
+try:
+    import ahocorasick
+except ImportError:
+    # Fall back to plain substring checks over the keyword index
+    ahocorasick = None
+
 logger = logging.getLogger(__name__)
 
+# Interned category strings handed to the graph state, looked up once here
+# instead of going through the Enum .value descriptor on every ticket
+_CATEGORY_VALUES = {category: sys.intern(category.value) for category in TicketCategory}
+
 
 class SimpleTicketClassifier:
     """
@@ -38,38 +50,68 @@ class SimpleTicketClassifier:
                 'feature request', 'general inquiry'
             ]
         }
+        
+        # Inverted index: each keyword with the categories it belongs to
+        keyword_categories = {}
+        for category, keyword_list in self.keywords.items():
+            for keyword in keyword_list:
+                keyword_categories.setdefault(keyword, []).append(category)
+        self._keyword_index = list(keyword_categories.items())
+        self._min_keyword_length = min(len(keyword) for keyword in keyword_categories)
+        
+        # Build one Aho-Corasick automaton over every keyword so a ticket is
+        # scanned once instead of once per keyword
+        self._automaton = None
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for keyword, categories in self._keyword_index:
+                self._automaton.add_word(keyword, (keyword, categories))
+            self._automaton.make_automaton()
+    
+    def _matched_keywords(self, full_text: str) -> Iterator[Tuple[str, List[TicketCategory]]]:
+        """Yield each keyword found in the text once, with its categories"""
+        if self._automaton is None:
+            for keyword, categories in self._keyword_index:
+                if keyword in full_text:
+                    yield keyword, categories
+            return
+        
+        # Each keyword counts once no matter how often it occurs
+        seen_keywords = set()
+        for _, (keyword, categories) in self._automaton.iter(full_text):
+            if keyword not in seen_keywords:
+                seen_keywords.add(keyword)
+                yield keyword, categories
     
     def classify_ticket(self, subject: str, description: str) -> Dict:
        
        
         full_text = f"{subject} {description}".lower()
         
-       
-        category_scores = {}
-        
-        for category, keyword_list in self.keywords.items():
-            score = 0
-            found_keywords = []
-            
-           
-            for keyword in keyword_list:
-                if keyword in full_text:
-                    score += 1
-                    found_keywords.append(keyword)
-            
-            category_scores[category] = {
-                'score': score,
-                'keywords': found_keywords
+        # Text shorter than every keyword cannot match anything
+        if len(full_text) < self._min_keyword_length:
+            return {
+                'category': TicketCategory.GENERAL,
+                'confidence': 0.3,
+                'reasoning': "No specific keywords found, using general category",
+                'score': 0
             }
         
+        # Matched keywords per category; a category's score is its match count
+        found_keywords = {category: [] for category in self.keywords}
+        
+        for keyword, categories in self._matched_keywords(full_text):
+            for category in categories:
+                found_keywords[category].append(keyword)
+        
         
         best_category = None
         best_score = 0
         
-        for category, data in category_scores.items():
-            if data['score'] > best_score:
+        for category, keywords in found_keywords.items():
+            if len(keywords) > best_score:
                 best_category = category
-                best_score = data['score']
+                best_score = len(keywords)
         
         
         if best_category is None or best_score == 0:
@@ -78,10 +120,11 @@ class SimpleTicketClassifier:
             reasoning = "No specific keywords found, using general category"
         else:
            
+            # Matches are a subset of the category's keywords, so this is <= 1.0
             total_possible = len(self.keywords[best_category])
-            confidence = min(best_score / total_possible, 1.0)
+            confidence = best_score / total_possible
             
-            found_words = category_scores[best_category]['keywords']
+            found_words = found_keywords[best_category]
             reasoning = f"Found {best_score} keywords: {', '.join(found_words)}"
         
         return {
@@ -92,6 +135,25 @@ class SimpleTicketClassifier:
         }
 
 
+# Shared classifier - the keyword automaton is built once at import time
+_CLASSIFIER = SimpleTicketClassifier()
+
+
+@lru_cache(maxsize=4096)
+def _classify_cached(subject: str, description: str) -> Dict:
+    """
+    Memoized classification - duplicate tickets (autoresponders, test pings,
+    templated messages) skip the keyword scan. The returned dict is shared
+    between callers, so treat it as read-only.
+    """
+    return _CLASSIFIER.classify_ticket(subject, description)
+
+
+def classification_cache_info():
+    """Hit/miss statistics for the classification cache"""
+    return _classify_cached.cache_info()
+
+
 def classify_ticket_node(state: Dict) -> Dict:
     """
     Simple function that takes ticket info and returns classification
@@ -111,40 +173,44 @@ def classify_ticket_node(state: Dict) -> Dict:
             processing_log.append("❌ Classification failed: Missing ticket information")
             
             return {
-                "classification": TicketCategory.GENERAL.value,
+                "classification": _CATEGORY_VALUES[TicketCategory.GENERAL],
                 "processing_log": processing_log
             }
         
-        # Create classifier and run classification
-        classifier = SimpleTicketClassifier()
-        result = classifier.classify_ticket(subject, description)
+        # Run classification with the shared classifier
+        result = _classify_cached(subject, description)
+        category = _CATEGORY_VALUES[result['category']]
         
-        logger.info(f"Classified as {result['category'].value} with confidence {result['confidence']:.2f}")
+        logger.info("Classified as %s with confidence %.2f", category, result['confidence'])
         
         # Add results to processing log
         processing_log = state.get("processing_log", [])
-        processing_log.append(f"✅ Classified as: {result['category'].value}")
-        processing_log.append(f"📊 Confidence: {result['confidence']:.2f}")
-        processing_log.append(f"🔍 Reasoning: {result['reasoning']}")
+        processing_log.extend([
+            f"✅ Classified as: {category}",
+            f"📊 Confidence: {result['confidence']:.2f}",
+            f"🔍 Reasoning: {result['reasoning']}"
+        ])
         
         # Return the updated state
         return {
-            "classification": result['category'].value,
+            "classification": category,
             "processing_log": processing_log,
             "classification_confidence": result['confidence']
         }
         
     except Exception as e:
         # If something goes wrong, log the error and use GENERAL category
+        logger.error("Classification error: %s", e)
         error_msg = f"Classification error: {str(e)}"
-        logger.error(error_msg)
         
         processing_log = state.get("processing_log", [])
-        processing_log.append(f"❌ {error_msg}")
-        processing_log.append(f"🔄 Using general category as fallback")
+        processing_log.extend([
+            f"❌ {error_msg}",
+            "🔄 Using general category as fallback"
+        ])
         
         return {
-            "classification": TicketCategory.GENERAL.value,
+            "classification": _CATEGORY_VALUES[TicketCategory.GENERAL],
             "processing_log": processing_log,
             "classification_confidence": 0.3
         }
@@ -188,7 +254,7 @@ def test_classifier():
         print(f"\nTest {i}:")
         print(f"Subject: {case['subject']}")
         print(f"Description: {case['description']}")
-        print(f"Result: {result['category'].value}")
+        print(f"Result: {_CATEGORY_VALUES[result['category']]}")
         print(f"Confidence: {result['confidence']:.2f}")
         print(f"Reasoning: {result['reasoning']}")
         print(f"Expected: {case['expected']}")
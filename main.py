@@ -4,30 +4,42 @@ Main application entry point for the Support Ticket Resolution Agent
 Run this file to test the complete workflow
 """
 
+from __future__ import annotations
+
 import os
 import sys
+import orjson
+import argparse
+import asyncio
 import logging
+import time
 from datetime import datetime
-from typing import Dict, Any
-
-# Add src to path for imports
-sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+from typing import Dict, Any, List
 
-from src.graph import create_support_graph
-from src.state import SupportTicketState
+# Only the state definitions are imported up front. The graph pulls in
+# LangGraph, the Groq client and the retriever, so it is only imported once
+# main() knows it needs it (not for --help)
+from src.state import INITIAL_STATE_TEMPLATE, SupportTicketState
 
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    format='%(asctime)s %(levelname)s %(message)s',
     handlers=[
         logging.StreamHandler(),
-        logging.FileHandler('support_agent.log')
+        # Opened on the first record, so --help doesn't touch the log file
+        logging.FileHandler('support_agent.log', delay=True)
     ]
 )
 
 logger = logging.getLogger(__name__)
 
+# Where run_batch_test appends one JSON line per processed ticket
+BATCH_RESULTS_FILE = os.getenv("BATCH_RESULTS_FILE", "results.jsonl")
+
+# Console rule lines, built once
+_RULE = "=" * 60
+
 
 def create_test_tickets():
     """Create sample tickets for testing"""
@@ -57,65 +69,74 @@ def create_test_tickets():
 
 def create_initial_state(subject: str, description: str) -> SupportTicketState:
 
-    return {
-        "subject": subject,
-        "description": description,
-        "classification": None,
-        "retrieved_context": None,
-        "formatted_context": None,
-        "retrieval_attempt": 1,  # <-- Initialize to 1
-        "draft_response": None,
-        "review_passed": None,
-        "reviewer_feedback": None,
-        "draft_attempt": 1,      # <-- Initialize to 1
-        "max_attempts_reached": None,
-        "escalated": None,
-        "processing_log": [],
-    }
+    state = INITIAL_STATE_TEMPLATE.copy()
+    state["subject"] = subject
+    state["description"] = description
+    # The log is mutable, so each ticket gets its own list
+    state["processing_log"] = []
+    return state
+
+
+def _print_input(state: SupportTicketState):
+    print(f"Subject: {state['subject']}")
+    print(f"Description: {state['description'][:100]}...")
+
+
+def _print_classification(state: SupportTicketState):
+    print(f"Classification: {state.get('classification', 'Not set')}")
+
+
+def _print_rag_retrieval(state: SupportTicketState):
+    context = state.get('retrieved_context', [])
+    print(f"Retrieved {len(context)} documents")
+    attempt = state.get('retrieval_attempt', 1)
+    print(f"Retrieval attempt: {attempt}")
+
+
+def _print_draft_generation(state: SupportTicketState):
+    draft = state.get('draft_response', '')
+    print(f"Draft preview: {draft[:150]}...")
+
+
+def _print_review(state: SupportTicketState):
+    passed = state.get('review_passed', False)
+    feedback = state.get('reviewer_feedback', '')
+    attempt = state.get('draft_attempt', 1)
+    print(f"Review passed: {passed}")
+    print(f"Draft attempt: {attempt}")
+    if feedback:
+        print(f"Feedback: {feedback[:100]}...")
+
+
+def _print_final(state: SupportTicketState):
+    escalated = state.get('escalated', False)
+    
+    if escalated:
+        print("❌ TICKET ESCALATED - Max attempts reached")
+    elif state.get('review_passed', False):
+        print("✅ TICKET RESOLVED - Response approved")
+    else:
+        print("⚠️ UNKNOWN STATE")
+
+
+# Step name -> function printing that step's part of the state
+_STEP_PRINTERS = {
+    "INPUT": _print_input,
+    "CLASSIFICATION": _print_classification,
+    "RAG_RETRIEVAL": _print_rag_retrieval,
+    "DRAFT_GENERATION": _print_draft_generation,
+    "REVIEW": _print_review,
+    "FINAL": _print_final,
+}
 
 
 def print_state_summary(state: SupportTicketState, step: str):
   
-    print(f"\n{'='*60}")
-    print(f"STEP: {step}")
-    print(f"{'='*60}")
-    
-    if step == "INPUT":
-        print(f"Subject: {state['subject']}")
-        print(f"Description: {state['description'][:100]}...")
-    
-    elif step == "CLASSIFICATION":
-        print(f"Classification: {state.get('classification', 'Not set')}")
-    
-    elif step == "RAG_RETRIEVAL":
-        context = state.get('retrieved_context', [])
-        print(f"Retrieved {len(context)} documents")
-        attempt = state.get('retrieval_attempt', 1)
-        print(f"Retrieval attempt: {attempt}")
-    
-    elif step == "DRAFT_GENERATION":
-        draft = state.get('draft_response', '')
-        print(f"Draft preview: {draft[:150]}...")
+    print(f"\n{_RULE}\nSTEP: {step}\n{_RULE}")
     
-    elif step == "REVIEW":
-        passed = state.get('review_passed', False)
-        feedback = state.get('reviewer_feedback', '')
-        attempt = state.get('draft_attempt', 1)
-        print(f"Review passed: {passed}")
-        print(f"Draft attempt: {attempt}")
-        if feedback:
-            print(f"Feedback: {feedback[:100]}...")
-    
-    elif step == "FINAL":
-        escalated = state.get('escalated', False)
-        max_attempts = state.get('max_attempts_reached', False)
-        
-        if escalated:
-            print("❌ TICKET ESCALATED - Max attempts reached")
-        elif state.get('review_passed', False):
-            print("✅ TICKET RESOLVED - Response approved")
-        else:
-            print("⚠️ UNKNOWN STATE")
+    printer = _STEP_PRINTERS.get(step)
+    if printer is not None:
+        printer(state)
 
 
 def run_single_ticket(graph, subject: str, description: str) -> Dict[str, Any]:
@@ -130,7 +151,7 @@ def run_single_ticket(graph, subject: str, description: str) -> Dict[str, Any]:
     
     try:
         # Run the workflow
-        logger.info(f"Starting workflow for ticket: {subject}")
+        logger.info("Starting workflow for ticket: %s", subject)
         
         # Execute the graph
         final_state = graph.invoke(initial_state)
@@ -149,7 +170,7 @@ def run_single_ticket(graph, subject: str, description: str) -> Dict[str, Any]:
         }
         
     except Exception as e:
-        logger.error(f"Workflow failed: {str(e)}")
+        logger.error("Workflow failed: %s", e)
         print(f"❌ ERROR: {str(e)}")
         return {
             "success": False,
@@ -158,16 +179,83 @@ def run_single_ticket(graph, subject: str, description: str) -> Dict[str, Any]:
         }
 
 
-        
+def summarize_final_state(subject: str, final_state: Dict[str, Any]) -> Dict[str, Any]:
+    """Reduce a finished workflow state to the fields reported per ticket"""
+    return {
+        "success": True,
+        "subject": subject,
+        "classification": final_state.get('classification'),
+        "escalated": bool(final_state.get('escalated', False)),
+        "review_passed": bool(final_state.get('review_passed', False)),
+        "attempts": final_state.get('draft_attempt', 1),
+    }
+
+
+async def process_tickets_concurrently(graph, tickets: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Run tickets through the graph together on one event loop"""
+    from src.groq_client import aclose_groq_client
+    
+    try:
+        final_states = await asyncio.gather(
+            *(graph.ainvoke(create_initial_state(t["subject"], t["description"])) for t in tickets),
+            return_exceptions=True
+        )
+    finally:
+        # The pooled async Groq connections belong to this event loop, which
+        # asyncio.run() closes when the batch is done
+        await aclose_groq_client()
+    
+    results = []
+    for ticket, final_state in zip(tickets, final_states):
+        subject = ticket["subject"]
+        if isinstance(final_state, Exception):
+            logger.error("Workflow failed for '%s': %s", subject, final_state)
+            results.append({"success": False, "subject": subject, "error": str(final_state)})
+        else:
+            results.append(summarize_final_state(subject, final_state))
+    return results
 
 
+def run_batch_test(graph) -> List[Dict[str, Any]]:
+    """Run all sample tickets through the workflow concurrently"""
+    test_tickets = create_test_tickets()
+    
+    print(f"\n{_RULE}\n🧪 BATCH TEST - {len(test_tickets)} tickets\n{_RULE}")
+    
+    # Each ticket is an independent, I/O-bound run of Groq calls, so the
+    # tickets can be in flight at the same time
+    start_time = time.perf_counter()
+    results = asyncio.run(process_tickets_concurrently(graph, test_tickets))
+    elapsed = time.perf_counter() - start_time
+    
+    # Results are also appended to a JSONL file so batch runs can be compared
+    # without a human reading the console
+    # The report is collected and written to stdout in one go rather than
+    # one print() per line
+    lines = []
+    with open(BATCH_RESULTS_FILE, "ab") as results_file:
+        for result in results:
+            results_file.write(orjson.dumps(result) + b"\n")
+            
+            if not result["success"]:
+                status = f"❌ ERROR: {result['error']}"
+            elif result["escalated"]:
+                status = "⚠️ ESCALATED"
+            else:
+                status = "✅ RESOLVED"
+            lines.append(f"\n{result['subject']}\n  {status}\n")
+            if result["success"]:
+                lines.append(f"  Classification: {result['classification']}, attempts: {result['attempts']}\n")
+    
+    lines.append(f"\nProcessed {len(results)} tickets in {elapsed:.1f}s\n")
+    lines.append(f"Results written to {BATCH_RESULTS_FILE}\n")
+    sys.stdout.write("".join(lines))
+    return results
 
 
 def run_interactive_mode(graph):
     """Run in interactive mode for manual testing"""
-    print("\n" + "="*60)
-    print("🎯 INTERACTIVE MODE")
-    print("="*60)
+    print(f"\n{_RULE}\n🎯 INTERACTIVE MODE\n{_RULE}")
     print("Enter your own support tickets to test the system")
     print("Type 'quit' to exit")
     
@@ -206,19 +294,42 @@ def run_interactive_mode(graph):
             break
 
 
-def main():
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Support Ticket Resolution Agent")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="run the batch test over all sample tickets and exit, without the menu"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
     """Main application entry point"""
+    args = parse_args(argv)
+    
     print("🤖 Support Ticket Resolution Agent")
     print("Built with LangGraph")
     print("="*50)
     
     try:
+        from src.graph import get_support_graph
+        from src.draft import get_draft_generator
+        from src.review import get_draft_reviewer
         
         print("Initializing LangGraph workflow...")
-        graph = create_support_graph()
+        graph = get_support_graph()
+        # Create the shared draft generator and reviewer now, so the first
+        # ticket doesn't pay for them and a missing GROQ_API_KEY fails here
+        # instead of mid-run
+        get_draft_generator()
+        get_draft_reviewer()
         print(" Graph initialized successfully!")
-
-        required_env_vars = ["GROQ_API_KEY"]
+        
+        if args.batch:
+            results = run_batch_test(graph)
+            return 0 if all(result["success"] for result in results) else 1
       
         # Show menu 
         while True:
@@ -226,7 +337,8 @@ def main():
             print("Choose an option:")
             print("1. Run interactive mode (enter your own tickets)")
             print("2. Run single sample ticket")
-            print("3. Quit")
+            print("3. Run batch test (all sample tickets)")
+            print("4. Quit")
             print("="*50)
             
             choice = input("Enter your choice (1-4): ").strip()
@@ -239,6 +351,9 @@ def main():
                 run_single_ticket(graph, ticket["subject"], ticket["description"])
 
             elif choice == "3":
+                run_batch_test(graph)
+
+            elif choice == "4":
                  break   
             else:
                 print("Invalid choice! Please enter 1-4.")
@@ -246,7 +361,7 @@ def main():
         print("\n👋 Thanks for using the Support Ticket Agent!")
         
     except Exception as e:
-        logger.error(f"Application failed to start: {str(e)}")
+        logger.error("Application failed to start: %s", e)
         print("\nPlease check:")
         print("1. All required files are present")
         print("2. Environment variables are set")
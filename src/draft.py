@@ -1,49 +1,159 @@
 # src/draft_generation.py
 import os
+import asyncio
+import hashlib
 import logging
-from typing import Dict
-from .groq_client import GroqClient
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from .groq_client import get_groq_client
 
-class DraftGenerator:
-    def __init__(self):
-        self.client = GroqClient()
-        self.logger = logging.getLogger(__name__)
-    
-    def generate_draft(self, subject: str, description: str, classification: str, 
-                      formatted_context: str, reviewer_feedback: str = None, 
-                      attempt: int = 1) -> str:
-       
-        self.logger.info(f"Generating draft for {classification} ticket, attempt {attempt}")
-        
-        
-        system_prompt = self._get_category_system_prompt(classification)
-        
-        
-        user_prompt = self._build_user_prompt(
-            subject, description, formatted_context, reviewer_feedback, attempt
-        )
-        
-        try:
-            
-            draft = self.client.simple_completion(
-                prompt=user_prompt,
-                system_prompt=system_prompt,
-                model="llama-3.1-8b-instant",  # Fast and capable model
-                temperature=0.3,
-                max_tokens=500
-            )
-            
-            self.logger.info("Draft generated successfully with Groq")
-            return draft
-            
-        except Exception as e:
-            self.logger.error(f"Error generating draft with Groq: {str(e)}")
-            return self._get_fallback_response(classification)
-    
-    def _get_category_system_prompt(self, classification: str) -> str:
-        """Get category-specific system prompts"""
-        
-        base_prompt = """You are a professional customer support agent. Your goal is to provide helpful, accurate, and empathetic responses to customer inquiries.
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+# Drafts keyed by a hash of the prompts and Groq settings, so repeated
+# tickets (same text, category, context and feedback) skip the LLM call. The
+# user prompt is whitespace-normalized first, so re-sent tickets that only
+# differ in spacing also hit. Shared across DraftGenerator instances and
+# graph threads.
+DRAFT_CACHE_SIZE = 1024
+_draft_cache: "OrderedDict[str, str]" = OrderedDict()
+_draft_cache_lock = threading.Lock()
+
+# Groq drafts wait here (draft text -> cache key) until the reviewer has seen
+# them. Only approved drafts move into the cache, so a ticket sent again
+# after escalating gets fresh drafts instead of replaying rejected ones.
+_pending_drafts: "OrderedDict[str, str]" = OrderedDict()
+
+# Drafts can also be persisted on disk (when diskcache is installed) so they
+# survive restarts. Set DRAFT_CACHE_DIR to a directory to enable it; the
+# cache is opened on first use, and an unusable directory leaves the cache
+# in memory only.
+DRAFT_CACHE_DIR = os.path.expanduser(os.getenv("DRAFT_CACHE_DIR", ""))
+_disk_cache = None
+_disk_cache_enabled = diskcache is not None and bool(DRAFT_CACHE_DIR)
+_disk_cache_lock = threading.Lock()
+
+
+def _get_disk_cache():
+    """Return the on-disk draft cache, opening it on first use, or None"""
+    global _disk_cache, _disk_cache_enabled
+    if _disk_cache is None and _disk_cache_enabled:
+        with _disk_cache_lock:
+            if _disk_cache is None and _disk_cache_enabled:
+                try:
+                    _disk_cache = diskcache.Cache(DRAFT_CACHE_DIR, size_limit=int(1e9))
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning("Draft disk cache unavailable at %s, keeping drafts in memory only: %s",
+                                   DRAFT_CACHE_DIR, e)
+                    _disk_cache_enabled = False
+    return _disk_cache
+
+
+def _draft_cache_key(system_prompt: str, user_prompt: str, params: Dict) -> str:
+    normalized_prompt = " ".join(user_prompt.split())
+    key_text = (f"{system_prompt}\x1f{normalized_prompt}\x1f{params['model']}"
+                f"\x1f{params['temperature']}\x1f{params['max_tokens']}")
+    return hashlib.sha1(key_text.encode("utf-8")).hexdigest()
+
+
+def _get_memory_draft(key: str) -> Optional[str]:
+    with _draft_cache_lock:
+        draft = _draft_cache.get(key)
+        if draft is not None:
+            _draft_cache.move_to_end(key)
+        return draft
+
+
+def _get_disk_draft(key: str) -> Optional[str]:
+    disk_cache = _get_disk_cache()
+    if disk_cache is None:
+        return None
+    try:
+        draft = disk_cache.get(key)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Draft disk cache read failed: %s", e)
+        return None
+    if draft is not None:
+        _remember_draft(key, draft)
+    return draft
+
+
+def _get_cached_draft(key: str) -> Optional[str]:
+    draft = _get_memory_draft(key)
+    if draft is None:
+        draft = _get_disk_draft(key)
+    return draft
+
+
+async def _aget_cached_draft(key: str) -> Optional[str]:
+    """Async version of _get_cached_draft; disk reads run off the event loop"""
+    draft = _get_memory_draft(key)
+    if draft is None and _disk_cache_enabled:
+        draft = await asyncio.to_thread(_get_disk_draft, key)
+    return draft
+
+
+def _remember_draft(key: str, draft: str) -> None:
+    with _draft_cache_lock:
+        _draft_cache[key] = draft
+        _draft_cache.move_to_end(key)
+        if len(_draft_cache) > DRAFT_CACHE_SIZE:
+            _draft_cache.popitem(last=False)
+
+
+def _store_disk_draft(key: str, draft: str) -> None:
+    disk_cache = _get_disk_cache()
+    if disk_cache is None:
+        return
+    try:
+        disk_cache.set(key, draft)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Draft disk cache write failed: %s", e)
+
+
+def _cache_draft(key: str, draft: str) -> None:
+    _remember_draft(key, draft)
+    _store_disk_draft(key, draft)
+
+
+def _hold_draft(key: str, draft: str) -> None:
+    with _draft_cache_lock:
+        _pending_drafts[draft] = key
+        _pending_drafts.move_to_end(draft)
+        if len(_pending_drafts) > DRAFT_CACHE_SIZE:
+            _pending_drafts.popitem(last=False)
+
+
+def _pop_pending_draft(draft: str) -> Optional[str]:
+    with _draft_cache_lock:
+        return _pending_drafts.pop(draft, None)
+
+
+def cache_approved_draft(draft: str) -> None:
+    """Cache a draft the reviewer approved, if it came from Groq"""
+    key = _pop_pending_draft(draft)
+    if key is not None:
+        _cache_draft(key, draft)
+
+
+async def acache_approved_draft(draft: str) -> None:
+    """Async version of cache_approved_draft; disk writes run off the event loop"""
+    key = _pop_pending_draft(draft)
+    if key is not None:
+        _remember_draft(key, draft)
+        if _disk_cache_enabled:
+            await asyncio.to_thread(_store_disk_draft, key, draft)
+
+
+# System prompts and fallback responses are static, so they are built once
+# at import time instead of on every draft
+_BASE_PROMPT = """You are a professional customer support agent. Your goal is to provide helpful, accurate, and empathetic responses to customer inquiries.
 
 IMPORTANT GUIDELINES:
 - Write directly to the customer - start with "Thank you" or "I understand" 
@@ -52,8 +162,8 @@ IMPORTANT GUIDELINES:
 - Provide clear solutions when possible
 - Keep it concise"""
 
-        category_prompts = {
-            "billing": base_prompt + """
+_CATEGORY_PROMPTS = {
+    "billing": _BASE_PROMPT + """
 
 BILLING-SPECIFIC RULES:
 - For refund requests, explain the process but don't guarantee approval
@@ -62,7 +172,7 @@ BILLING-SPECIFIC RULES:
 - Always mention checking account settings for payment updates
 - Be clear about billing cycles and timing""",
 
-            "technical": base_prompt + """
+    "technical": _BASE_PROMPT + """
 
 TECHNICAL-SPECIFIC RULES:
 - Provide step-by-step troubleshooting when possible
@@ -71,7 +181,7 @@ TECHNICAL-SPECIFIC RULES:
 - Ask for specific error messages or browser/device info if needed
 - Offer to escalate to technical team for complex issues""",
 
-            "security": base_prompt + """
+    "security": _BASE_PROMPT + """
 
 SECURITY-SPECIFIC RULES:
 - Take all security concerns seriously
@@ -81,7 +191,7 @@ SECURITY-SPECIFIC RULES:
 - Emphasize the importance of strong passwords and 2FA
 - Direct urgent security issues to the security team""",
 
-            "general": base_prompt + """
+    "general": _BASE_PROMPT + """
 
 GENERAL SUPPORT RULES:
 - Provide helpful information about our services
@@ -89,32 +199,24 @@ GENERAL SUPPORT RULES:
 - Direct users to appropriate resources or teams
 - Be patient with general questions
 - Offer additional help if needed"""
-        }
-        
-        return category_prompts.get(classification.lower(), base_prompt)
-    
-    def _build_user_prompt(self, subject: str, description: str, formatted_context: str, 
-                          reviewer_feedback: str = None, attempt: int = 1) -> str:
-        """Build the user prompt with ticket details and context"""
-        
-        prompt = f"""Please draft a response to this customer support ticket:
+}
 
-TICKET DETAILS:
-Subject: {subject}
-Description: {description}
+_FALLBACK_RESPONSES = {
+    "billing": "Thank you for contacting us about your billing inquiry. I understand your concern and want to help resolve this for you. Please allow me some time to review your account details, and I'll get back to you within 24 hours with a comprehensive response. If this is urgent, please contact our billing support team directly.",
 
-AVAILABLE DOCUMENTATION:
-{formatted_context}"""
+    "technical": "Thank you for reaching out about this technical issue. I understand how frustrating this can be. While I gather more information to provide you with the best solution, please try these quick steps: clear your browser cache, ensure you're using the latest version of the application, and restart your device. I'll follow up with more specific guidance shortly.",
 
-        # Add reviewer feedback for retries
-        if reviewer_feedback and attempt > 1:
-            prompt += f"""
+    "security": "Thank you for bringing this security concern to our attention. Your account security is our top priority. As a precautionary measure, please change your password immediately if you haven't already done so. I'm escalating this to our security team who will review your account and contact you within 2 hours.",
+
+    "general": "Thank you for contacting our support team. I understand you need assistance, and I'm here to help. I'm currently reviewing your inquiry to provide you with the most accurate information. I'll respond with detailed guidance within 24 hours. If you have any urgent concerns, please don't hesitate to reach out again."
+}
 
-PREVIOUS ATTEMPT FEEDBACK:
-The previous response was rejected with this feedback: {reviewer_feedback}
-Please address these concerns in your new response."""
+_USER_PROMPT_HEADER = """Please draft a response to this customer support ticket:
+
+TICKET DETAILS:
+"""
 
-        prompt += """
+_USER_PROMPT_INSTRUCTIONS = """
 
 Please write a helpful response that:
 1. Acknowledges the customer's issue
@@ -125,28 +227,155 @@ Please write a helpful response that:
 
 RESPONSE:"""
 
-        return prompt
+
+class DraftGenerator:
+    def __init__(self):
+        self.client = get_groq_client()
+        self.logger = logging.getLogger(__name__)
     
-    def _get_fallback_response(self, classification: str) -> str:
+    def generate_draft(self, subject: str, description: str, classification: str, 
+                      formatted_context: str, reviewer_feedback: str = None, 
+                      attempt: int = 1) -> str:
+       
+        self.logger.info("Generating draft for %s ticket, attempt %s", classification, attempt)
+        
+        system_prompt, user_prompt, params, cache_key = self._prepare_prompts(
+            subject, description, classification, formatted_context, reviewer_feedback, attempt
+        )
+        
+        cached_draft = _get_cached_draft(cache_key)
+        if cached_draft is not None:
+            self.logger.info("Returning cached draft")
+            return cached_draft
         
-        fallback_responses = {
-            "billing": "Thank you for contacting us about your billing inquiry. I understand your concern and want to help resolve this for you. Please allow me some time to review your account details, and I'll get back to you within 24 hours with a comprehensive response. If this is urgent, please contact our billing support team directly.",
+        try:
             
-            "technical": "Thank you for reaching out about this technical issue. I understand how frustrating this can be. While I gather more information to provide you with the best solution, please try these quick steps: clear your browser cache, ensure you're using the latest version of the application, and restart your device. I'll follow up with more specific guidance shortly.",
+            draft = self.client.simple_completion(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                **params
+            )
             
-            "security": "Thank you for bringing this security concern to our attention. Your account security is our top priority. As a precautionary measure, please change your password immediately if you haven't already done so. I'm escalating this to our security team who will review your account and contact you within 2 hours.",
+            self.logger.info("Draft generated successfully with Groq")
+            # Only real LLM drafts are held for caching, never the fallback
+            # responses; review_node caches them once approved
+            _hold_draft(cache_key, draft)
+            return draft
             
-            "general": "Thank you for contacting our support team. I understand you need assistance, and I'm here to help. I'm currently reviewing your inquiry to provide you with the most accurate information. I'll respond with detailed guidance within 24 hours. If you have any urgent concerns, please don't hesitate to reach out again."
+        except Exception as e:
+            self.logger.error("Error generating draft with Groq: %s", e)
+            return self._get_fallback_response(classification)
+    
+    async def agenerate_draft(self, subject: str, description: str, classification: str,
+                              formatted_context: str, reviewer_feedback: str = None,
+                              attempt: int = 1) -> str:
+        """Async version of generate_draft, awaiting Groq on the event loop"""
+        self.logger.info("Generating draft for %s ticket, attempt %s", classification, attempt)
+        
+        system_prompt, user_prompt, params, cache_key = self._prepare_prompts(
+            subject, description, classification, formatted_context, reviewer_feedback, attempt
+        )
+        
+        cached_draft = await _aget_cached_draft(cache_key)
+        if cached_draft is not None:
+            self.logger.info("Returning cached draft")
+            return cached_draft
+        
+        try:
+            draft = await self.client.asimple_completion(
+                prompt=user_prompt,
+                system_prompt=system_prompt,
+                **params
+            )
+            
+            self.logger.info("Draft generated successfully with Groq")
+            _hold_draft(cache_key, draft)
+            return draft
+            
+        except Exception as e:
+            self.logger.error("Error generating draft with Groq: %s", e)
+            return self._get_fallback_response(classification)
+    
+    def _prepare_prompts(self, subject: str, description: str, classification: str,
+                         formatted_context: str, reviewer_feedback: str, attempt: int):
+        """Build the prompts, Groq settings and draft cache key for an attempt"""
+        system_prompt = self._get_category_system_prompt(classification)
+        
+        user_prompt = self._build_user_prompt(
+            subject, description, formatted_context, reviewer_feedback, attempt
+        )
+        
+        params = self._completion_params(attempt)
+        cache_key = _draft_cache_key(system_prompt, user_prompt, params)
+        return system_prompt, user_prompt, params, cache_key
+    
+    def _completion_params(self, attempt: int) -> Dict:
+        """Groq model settings for a draft attempt"""
+        return {
+            "model": "llama-3.1-8b-instant",  # Fast and capable model
+            "temperature": 0.3,
+            # Retries only need to address the reviewer's feedback, so cap
+            # their length to keep the slowest path short
+            "max_tokens": 500 if attempt == 1 else 300
         }
+    
+    def _get_category_system_prompt(self, classification: str) -> str:
+        """Get category-specific system prompts"""
+        # Classifier output is already lowercase; only lower() other spellings
+        if classification in _CATEGORY_PROMPTS:
+            return _CATEGORY_PROMPTS[classification]
+        return _CATEGORY_PROMPTS.get(classification.lower(), _BASE_PROMPT)
+    
+    def _build_user_prompt(self, subject: str, description: str, formatted_context: str, 
+                          reviewer_feedback: str = None, attempt: int = 1) -> str:
+        """Build the user prompt with ticket details and context"""
+        
+        # Collect the pieces and join once, so a long formatted_context is
+        # only copied a single time
+        parts = [
+            _USER_PROMPT_HEADER,
+            "Subject: ", subject,
+            "\nDescription: ", description,
+            "\n\nAVAILABLE DOCUMENTATION:\n", formatted_context,
+        ]
+        
+        # Add reviewer feedback for retries
+        if reviewer_feedback and attempt > 1:
+            parts.extend([
+                "\n\nPREVIOUS ATTEMPT FEEDBACK:\n"
+                "The previous response was rejected with this feedback: ", reviewer_feedback,
+                "\nPlease address these concerns in your new response."
+            ])
         
-        return fallback_responses.get(classification.lower(), fallback_responses["general"])
+        parts.append(_USER_PROMPT_INSTRUCTIONS)
+        return "".join(parts)
+    
+    def _get_fallback_response(self, classification: str) -> str:
+        if classification in _FALLBACK_RESPONSES:
+            return _FALLBACK_RESPONSES[classification]
+        return _FALLBACK_RESPONSES.get(classification.lower(), _FALLBACK_RESPONSES["general"])
+
+
+# One DraftGenerator shared by every draft node call
+_GENERATOR: Optional[DraftGenerator] = None
+_GENERATOR_LOCK = threading.Lock()
+
+
+def get_draft_generator() -> DraftGenerator:
+    """Return the shared DraftGenerator, creating it on first use"""
+    global _GENERATOR
+    if _GENERATOR is None:
+        with _GENERATOR_LOCK:
+            if _GENERATOR is None:
+                _GENERATOR = DraftGenerator()
+    return _GENERATOR
 
 
 def draft_generation_node(state: Dict) -> Dict:
     """
     LangGraph node function for draft generation
     """
-    generator = DraftGenerator()
+    generator = get_draft_generator()
     
     # Generate the draft response
     draft = generator.generate_draft(
@@ -163,6 +392,26 @@ def draft_generation_node(state: Dict) -> Dict:
     }
 
 
+async def adraft_generation_node(state: Dict) -> Dict:
+    """
+    Async LangGraph node function for draft generation, used by ainvoke/abatch
+    """
+    generator = get_draft_generator()
+    
+    draft = await generator.agenerate_draft(
+        subject=state['subject'],
+        description=state['description'],
+        classification=state['classification'],
+        formatted_context=state['formatted_context'],
+        reviewer_feedback=state.get('reviewer_feedback'),
+        attempt=state.get('retrieval_attempt', 1)
+    )
+    
+    return {
+        "draft_response": draft
+    }
+
+
 # Test function
 def test_draft_generation():
     """Test the draft generation functionality"""
@@ -1,13 +1,49 @@
 # src/escalation_logger.py
+import atexit
 import csv
+import logging
 import os
+import queue
+import threading
+import time
 from datetime import datetime
 from typing import Dict
 
+logger = logging.getLogger(__name__)
+
+_ROW_FORMAT = "{ts},{subject},{description},{classification},{attempts},{draft},{feedback},Max attempts reached\r\n"
+
+
+def _csv_field(value) -> str:
+    """Render one CSV field the way csv.writer does (minimal quoting)"""
+    if value is None:
+        return ""
+    text = str(value)
+    if ',' in text or '"' in text or '\n' in text or '\r' in text:
+        return '"' + text.replace('"', '""') + '"'
+    return text
+
+
 class EscalationLogger:
-    def __init__(self, csv_file: str = "escalation_log.csv"):
+    def __init__(self, csv_file: str = "escalation_log.csv", batch_size: int = 32,
+                 flush_interval_ms: int = 1000):
         self.csv_file = csv_file
         self._ensure_csv_exists()
+        
+        # log_escalation only enqueues a preformatted row. A background thread
+        # collects rows until batch_size are pending or flush_interval_ms has
+        # passed since the first one, then writes the batch with a single
+        # os.write() on an O_APPEND descriptor, so appends from several
+        # processes never overwrite each other
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval_ms / 1000
+        self._queue = queue.Queue()
+        self._fd = os.open(self.csv_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._writer_thread = threading.Thread(
+            target=self._run, name="escalation-log-writer", daemon=True
+        )
+        self._writer_thread.start()
+        atexit.register(self.close)
     
     def _ensure_csv_exists(self):
         
@@ -28,46 +64,119 @@ class EscalationLogger:
     def log_escalation(self, state: Dict):
         """Log an escalated ticket to CSV"""
         try:
-            with open(self.csv_file, 'a', newline='', encoding='utf-8') as file:
-                writer = csv.writer(file)
-                writer.writerow([
-                    datetime.now().isoformat(),
-                    state.get('subject', ''),
-                    state.get('description', ''),
-                    state.get('classification', ''),
-                    state.get('draft_attempt', 1),
-                    state.get('draft_response', ''),
-                    state.get('reviewer_feedback', ''),
-                    'Max attempts reached'
-                ])
-            print(f"✅ Escalation logged to {self.csv_file}")
+            row = _ROW_FORMAT.format(
+                ts=datetime.now().isoformat(),
+                subject=_csv_field(state.get('subject', '')),
+                description=_csv_field(state.get('description', '')),
+                classification=_csv_field(state.get('classification', '')),
+                attempts=_csv_field(state.get('draft_attempt', 1)),
+                draft=_csv_field(state.get('draft_response', '')),
+                feedback=_csv_field(state.get('reviewer_feedback', ''))
+            ).encode('utf-8')
+            self._queue.put_nowait(row)
+            logger.debug("Escalation queued for %s", self.csv_file)
         except Exception as e:
-            print(f"❌ Failed to log escalation: {str(e)}")
-
-# Update the escalation node in graph.py to use this
-def escalation_node_with_logging(state: Dict) -> dict:
-    """Enhanced escalation node with CSV logging"""
-    import logging
+            logger.error("Failed to log escalation: %s", e)
     
-    logger = logging.getLogger(__name__)
-    logger.info("Escalating ticket after max attempts reached")
+    def flush(self):
+        """Block until every queued row has been written to the CSV file"""
+        if self._writer_thread.is_alive():
+            self._queue.join()
     
-    # Log to CSV
-    escalation_logger = EscalationLogger()
-    escalation_logger.log_escalation(state)
+    def close(self):
+        """Write the remaining rows, stop the writer thread and close the file"""
+        if self._writer_thread.is_alive():
+            self._queue.put(None)
+            self._writer_thread.join()
+        if self._fd is not None:
+            # Make sure the escalation record survives a crash after exit
+            os.fsync(self._fd)
+            os.close(self._fd)
+            self._fd = None
     
-    escalation_message = f"""This ticket has been escalated for human review after failing automated processing.
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self._flush_interval
+            
+            # Keep collecting until the batch is full, the window closes or
+            # close() sends the None sentinel
+            while batch[-1] is not None and len(batch) < self._batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            
+            stop = batch[-1] is None
+            rows = batch[:-1] if stop else batch
+            try:
+                if rows:
+                    data = memoryview(b"".join(rows))
+                    while data:
+                        data = data[os.write(self._fd, data):]
+            except Exception as e:
+                logger.error("Failed to write escalation log: %s", e)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            
+            if stop:
+                return
+
+
+# Shared logger, so the CSV file stays open and rows from every escalated
+# ticket are batched together
+_ESCALATION_LOGGER = None
+_ESCALATION_LOGGER_LOCK = threading.Lock()
+
+
+def get_escalation_logger() -> EscalationLogger:
+    """Return the shared EscalationLogger, creating it on first use"""
+    global _ESCALATION_LOGGER
+    if _ESCALATION_LOGGER is None:
+        with _ESCALATION_LOGGER_LOCK:
+            if _ESCALATION_LOGGER is None:
+                _ESCALATION_LOGGER = EscalationLogger()
+    return _ESCALATION_LOGGER
+
+_ESCALATION_MESSAGE = """This ticket has been escalated for human review after failing automated processing.
 
 Original Ticket:
-Subject: {state['subject']}  
-Description: {state['description']}
-Classification: {state['classification']}
+Subject: {subject}  
+Description: {description}
+Classification: {classification}
 
-Attempts Made: {state.get('draft_attempt', 1)}
-Failed Draft: {state.get('draft_response', 'No draft generated')}
-Final Reviewer Feedback: {state.get('reviewer_feedback', 'No feedback available')}
+Attempts Made: {draft_attempt}
+Failed Draft: {draft_response}
+Final Reviewer Feedback: {reviewer_feedback}
 
 Please review and respond manually."""
+
+_ESCALATION_DEFAULTS = {
+    'draft_attempt': 1,
+    'draft_response': 'No draft generated',
+    'reviewer_feedback': 'No feedback available',
+}
+
+
+class _EscalationFields(dict):
+    """State view for _ESCALATION_MESSAGE that fills in absent keys"""
+    def __missing__(self, key):
+        return _ESCALATION_DEFAULTS.get(key, '')
+
+
+# Update the escalation node in graph.py to use this
+def escalation_node_with_logging(state: Dict) -> dict:
+    """Enhanced escalation node with CSV logging"""
+    logger.info("Escalating ticket after max attempts reached")
+    
+    # Log to CSV
+    get_escalation_logger().log_escalation(state)
+    
+    escalation_message = _ESCALATION_MESSAGE.format_map(_EscalationFields(state))
     
     return {
         "escalated": True,
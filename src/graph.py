@@ -1,37 +1,58 @@
 # src/graph.py
 import logging
+from functools import lru_cache
 from typing import Dict
 from langgraph.graph import StateGraph, END
+from langchain_core.runnables import RunnableLambda
 from .state import SupportTicketState
 from classifier import classify_ticket_node
 from .rag_retrieval import RAGRetriever
-from .draft import draft_generation_node
-from .review import review_node
+from .draft import draft_generation_node, adraft_generation_node, get_draft_generator
+from .review import review_node, areview_node
 from .escalation_logger import escalation_node_with_logging
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=1)
+def _retriever() -> RAGRetriever:
+    """Shared RAGRetriever for the retrieval nodes"""
+    return RAGRetriever()
+
+
+@lru_cache(maxsize=1024)
+def _cached_retrieve(classification: str, subject: str, description: str,
+                     reviewer_feedback: str, attempt: int):
+    """
+    Retrieve and format context for a ticket, memoized on every input that
+    affects the result. The returned document list is shared between callers,
+    so treat it as read-only.
+    """
+    retriever = _retriever()
+    retrieved_docs = retriever.retrieve_context(
+        classification=classification,
+        subject=subject,
+        description=description,
+        reviewer_feedback=reviewer_feedback,
+        attempt=attempt
+    )
+    return retrieved_docs, retriever.format_context_for_prompt(retrieved_docs)
+
+
 def rag_retrieval_node(state: SupportTicketState) -> Dict:
     
-    retriever = RAGRetriever()
-    
-   
     attempt = state.get('retrieval_attempt', 1)
     
    
-    retrieved_docs = retriever.retrieve_context(
-        classification=state['classification'],
-        subject=state['subject'],
-        description=state['description'],
-        reviewer_feedback=state.get('reviewer_feedback'),
-        attempt=attempt
+    retrieved_docs, formatted_context = _cached_retrieve(
+        state['classification'],
+        state['subject'],
+        state['description'],
+        state.get('reviewer_feedback'),
+        attempt
     )
     
-  
-    formatted_context = retriever.format_context_for_prompt(retrieved_docs)
-    
-    logger.info(f"RAG retrieval completed, attempt {attempt}")
+    logger.info("RAG retrieval completed, attempt %s", attempt)
     
     return {
         "retrieved_context": retrieved_docs,
@@ -43,25 +64,19 @@ def rag_retrieval_node(state: SupportTicketState) -> Dict:
 
 def retry_rag_node(state: SupportTicketState) -> Dict:
    
-    retriever = RAGRetriever()
-    
-    
     attempt = state.get('retrieval_attempt', 1) + 1
     
-    logger.info(f"Retry RAG retrieval, attempt {attempt}")
+    logger.info("Retry RAG retrieval, attempt %s", attempt)
     
   
-    retrieved_docs = retriever.retrieve_context(
-        classification=state['classification'],
-        subject=state['subject'],
-        description=state['description'],
-        reviewer_feedback=state.get('reviewer_feedback'),
-        attempt=attempt
+    retrieved_docs, formatted_context = _cached_retrieve(
+        state['classification'],
+        state['subject'],
+        state['description'],
+        state.get('reviewer_feedback'),
+        attempt
     )
     
- 
-    formatted_context = retriever.format_context_for_prompt(retrieved_docs)
-    
     return {
         "retrieved_context": retrieved_docs,
         "formatted_context": formatted_context,
@@ -71,14 +86,12 @@ def retry_rag_node(state: SupportTicketState) -> Dict:
 
 def retry_draft_node(state: SupportTicketState) -> Dict:
     
-    from .draft import DraftGenerator
-    
-    generator = DraftGenerator()
+    generator = get_draft_generator()
     
    
     attempt = state.get('draft_attempt', 1) + 1
     
-    logger.info(f"Retry draft generation, attempt {attempt}")
+    logger.info("Retry draft generation, attempt %s", attempt)
     
     
     draft = generator.generate_draft(
@@ -96,45 +109,66 @@ def retry_draft_node(state: SupportTicketState) -> Dict:
     }
 
 
-def check_max_attempts(state: SupportTicketState) -> str:
-  
-    attempt = state.get('draft_attempt', 1)
-    review_passed = state.get('review_passed', False)
+async def aretry_draft_node(state: SupportTicketState) -> Dict:
+    """Async version of retry_draft_node, used by ainvoke/abatch"""
+    generator = get_draft_generator()
     
-    logger.info(f"Checking attempts: {attempt}, review_passed: {review_passed}")
+    attempt = state.get('draft_attempt', 1) + 1
     
-    if review_passed:
-        return "approved"
-    elif attempt >= 3:  
-        logger.warning("Maximum attempts reached, escalating")
-        return "max_attempts_reached"
-    else:
-        logger.info("Retrying after failed review")
-        return "retry"
+    logger.info("Retry draft generation, attempt %s", attempt)
+    
+    draft = await generator.agenerate_draft(
+        subject=state['subject'],
+        description=state['description'],
+        classification=state['classification'],
+        formatted_context=state['formatted_context'],
+        reviewer_feedback=state.get('reviewer_feedback'),
+        attempt=attempt
+    )
+    
+    return {
+        "draft_response": draft,
+        "draft_attempt": attempt
+    }
 
 
-# def escalation_node(state: SupportTicketState) -> Dict:
-   
-#     logger.info("Escalating ticket after max attempts reached")
-    
-#     escalation_message = f"""This ticket has been escalated for human review after failing automated processing.
+def retry_node(state: SupportTicketState) -> Dict:
+    """
+    Retry after a rejected review: retrieve again with the reviewer's
+    feedback and redraft with the new context, as one graph step
+    """
+    updates = retry_rag_node(state)
+    updates.update(retry_draft_node({**state, **updates}))
+    return updates
+
+
+async def aretry_node(state: SupportTicketState) -> Dict:
+    """Async version of retry_node, used by ainvoke/abatch"""
+    updates = retry_rag_node(state)
+    updates.update(await aretry_draft_node({**state, **updates}))
+    return updates
+
 
-# Original Ticket:
-# Subject: {state['subject']}  
-# Description: {state['description']}
-# Classification: {state['classification']}
+# Route after review, indexed by [review_passed][out of attempts]
+_ROUTES = (
+    ("retry", "max_attempts_reached"),
+    ("approved", "approved"),
+)
 
-# Attempts Made: {state.get('draft_attempt', 1)}
-# Failed Draft: {state.get('draft_response', 'No draft generated')}
-# Final Reviewer Feedback: {state.get('reviewer_feedback', 'No feedback available')}
 
-# Please review and respond manually."""
+def check_max_attempts(state: SupportTicketState) -> str:
+  
+    attempt = state.get('draft_attempt', 1)
+    review_passed = state.get('review_passed', False)
+    # The review node sets max_attempts_reached itself for tickets no
+    # redraft can fix, so they escalate without the retries
+    out_of_attempts = attempt >= 3 or bool(state.get('max_attempts_reached'))
     
-#     return {
-#         "escalated": True,
-#         "max_attempts_reached": True,
-#         "escalation_message": escalation_message
-#     }
+    route = _ROUTES[bool(review_passed)][out_of_attempts]
+    logger.info("Checking attempts: %s, review_passed: %s -> %s", attempt, review_passed, route)
+    if route == "max_attempts_reached":
+        logger.warning("Maximum attempts reached, escalating")
+    return route
 
 
 def create_support_graph():
@@ -148,10 +182,11 @@ def create_support_graph():
    
     graph.add_node("classify_ticket", classify_ticket_node)
     graph.add_node("rag_retrieval", rag_retrieval_node)
-    graph.add_node("draft_response", draft_generation_node)
-    graph.add_node("review_draft", review_node)
-    graph.add_node("retry_rag", retry_rag_node)
-    graph.add_node("retry_draft", retry_draft_node)
+    # LLM nodes get both a sync and an async implementation: invoke() runs
+    # the sync one, ainvoke()/abatch() await Groq directly on the event loop
+    graph.add_node("draft_response", RunnableLambda(draft_generation_node, afunc=adraft_generation_node))
+    graph.add_node("review_draft", RunnableLambda(review_node, afunc=areview_node))
+    graph.add_node("retry", RunnableLambda(retry_node, afunc=aretry_node))
     graph.add_node("escalation", escalation_node_with_logging)
     
     
@@ -166,14 +201,13 @@ def create_support_graph():
         check_max_attempts,
         {
             "approved": END,
-            "retry": "retry_rag", 
+            "retry": "retry", 
             "max_attempts_reached": "escalation"
         }
     )
     
    
-    graph.add_edge("retry_rag", "retry_draft")
-    graph.add_edge("retry_draft", "review_draft")
+    graph.add_edge("retry", "review_draft")
     
   
     graph.add_edge("escalation", END)
@@ -185,10 +219,20 @@ def create_support_graph():
         logger.info("Graph compiled successfully")
         return compiled_graph
     except Exception as e:
-        logger.error(f"Failed to compile graph: {str(e)}")
+        logger.error("Failed to compile graph: %s", e)
         raise
 
 
+@lru_cache(maxsize=1)
+def get_support_graph():
+    """
+    Return the compiled support graph, building it on first use. The
+    compiled graph holds no per-ticket state, so every caller in the
+    process can share it
+    """
+    return create_support_graph()
+
+
 
 def test_graph_creation():
     """Test that the graph can be created and compiled successfully"""
@@ -1,23 +1,108 @@
 # src/groq_client.py
 import os
+import asyncio
+import random
+import threading
+import time
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import logging
-from typing import List, Dict, Optional
+from typing import AsyncIterator, Callable, Dict, Iterator, List, Optional
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:
+    # Fall back to the standard library encoder/decoder
+    orjson = None
+
 load_dotenv()
 
+# Transient Groq failures (rate limits, overloaded backends, dropped
+# connections) are retried with exponential backoff and full jitter. After
+# BREAKER_THRESHOLD calls in a row fail that way, calls fail fast for
+# BREAKER_COOLDOWN seconds instead of queueing more retries behind an outage.
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+MAX_RETRIES = 3
+RETRY_BACKOFF_BASE = 0.25
+RETRY_BACKOFF_CAP = 4.0
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+# Seconds to wait for a connection or for the next chunk of a response. A
+# call that stalls past this fails with a timeout and is retried like any
+# other transient error, instead of holding up the graph for a minute.
+REQUEST_TIMEOUT = float(os.getenv("GROQ_REQUEST_TIMEOUT", "10"))
+
+
+def _dumps(payload: Dict) -> bytes:
+    """Serialize a request body to JSON bytes"""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload).encode("utf-8")
+
+
+def _loads(data: bytes):
+    """Parse a JSON response body"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
 class GroqClient:
     """Simple client for Groq API"""
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, timeout: float = REQUEST_TIMEOUT):
         self.api_key = api_key or os.getenv("GROQ_API_KEY")
         self.base_url = "https://api.groq.com/openai/v1"
+        self.timeout = timeout
         self.logger = logging.getLogger(__name__)
         
         if not self.api_key:
             raise ValueError("GROQ_API_KEY is required. Set it as environment variable or pass it directly.")
+        
+        # Connections (and their TLS sessions) are kept alive and reused across
+        # calls. Retries are handled by chat_completion, not the adapter.
+        self._headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"Bearer {self.api_key}"
+        }
+        adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64)
+        self.session = requests.Session()
+        self.session.headers.update(self._headers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        
+        # Async connection pool, reused across calls. An httpx.AsyncClient
+        # belongs to the event loop it was first used on, so a new one is made
+        # if the client is used from a different loop (e.g. repeated asyncio.run)
+        self._async_client: Optional[httpx.AsyncClient] = None
+        self._async_client_loop = None
+        
+        # Circuit breaker state
+        self._consecutive_failures = 0
+        self._breaker_open_until = 0.0
+    
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Return the pooled AsyncClient for the running event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                headers=self._headers,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=64)
+            )
+            self._async_client_loop = loop
+        return self._async_client
+    
+    async def aclose(self):
+        """Close the pooled async connections"""
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_client_loop = None
     
     def chat_completion(self, messages: List[Dict], model: str = "llama-3.1-8b-instant", 
                        temperature: float = 0.7, max_tokens: int = 1024,
@@ -36,45 +121,123 @@ class GroqClient:
         Returns:
             Response dict from the API
         """
-        payload = {
+        body = _dumps(self._build_payload(messages, model, temperature, max_tokens, stream))
+        self._check_breaker()
+        
+        for attempt in range(MAX_RETRIES + 1):
+            response = None
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/chat/completions",
+                    data=body,
+                    timeout=self.timeout
+                )
+            except requests.exceptions.RequestException as e:
+                error_msg = f"Request failed: {str(e)}"
+            else:
+                if response.status_code == 200:
+                    self._consecutive_failures = 0
+                    return _loads(response.content)
+                error_msg = self._error_message(response)
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            
+            if attempt < MAX_RETRIES:
+                delay = self._retry_delay(attempt, response)
+                self.logger.warning("%s, retrying in %.2fs", error_msg, delay)
+                time.sleep(delay)
+        else:
+            self._record_transient_failure()
+        
+        self.logger.error(error_msg)
+        raise Exception(error_msg)
+    
+    async def achat_completion(self, messages: List[Dict], model: str = "llama-3.1-8b-instant",
+                               temperature: float = 0.7, max_tokens: int = 1024,
+                               stream: bool = False) -> Dict:
+        """
+        Async version of chat_completion, so graph nodes running on the event
+        loop can await Groq without tying up a thread. Same arguments and
+        return value as chat_completion.
+        """
+        body = _dumps(self._build_payload(messages, model, temperature, max_tokens, stream))
+        self._check_breaker()
+        
+        for attempt in range(MAX_RETRIES + 1):
+            response = None
+            try:
+                response = await self._get_async_client().post(
+                    f"{self.base_url}/chat/completions",
+                    content=body
+                )
+            except httpx.HTTPError as e:
+                # httpx timeouts have an empty message, so fall back to the type
+                error_msg = f"Request failed: {str(e) or type(e).__name__}"
+            else:
+                if response.status_code == 200:
+                    self._consecutive_failures = 0
+                    return _loads(response.content)
+                error_msg = self._error_message(response)
+                if response.status_code not in RETRY_STATUSES:
+                    break
+            
+            if attempt < MAX_RETRIES:
+                delay = self._retry_delay(attempt, response)
+                self.logger.warning("%s, retrying in %.2fs", error_msg, delay)
+                await asyncio.sleep(delay)
+        else:
+            self._record_transient_failure()
+        
+        self.logger.error(error_msg)
+        raise Exception(error_msg)
+    
+    def _retry_delay(self, attempt: int, response=None) -> float:
+        """Seconds to wait before retry number attempt + 1"""
+        # Honor the server's Retry-After (in seconds) when it sends one
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            try:
+                return min(RETRY_BACKOFF_CAP, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+        return random.uniform(0, min(RETRY_BACKOFF_CAP, RETRY_BACKOFF_BASE * 2 ** attempt))
+    
+    def _check_breaker(self):
+        """Fail fast while the circuit breaker is open"""
+        if time.monotonic() < self._breaker_open_until:
+            error_msg = "Groq API unavailable: circuit breaker open after repeated failures"
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+    
+    def _record_transient_failure(self):
+        """Count a call that failed after all retries; trip the breaker if needed"""
+        self._consecutive_failures += 1
+        if self._consecutive_failures >= BREAKER_THRESHOLD:
+            self._breaker_open_until = time.monotonic() + BREAKER_COOLDOWN
+            self._consecutive_failures = 0
+            self.logger.error("Opening Groq circuit breaker for %.0fs", BREAKER_COOLDOWN)
+    
+    def _build_payload(self, messages: List[Dict], model: str, temperature: float,
+                       max_tokens: int, stream: bool) -> Dict:
+        """Build the JSON payload for a chat completion request"""
+        return {
             "messages": messages,
             "model": model,
             "stream": stream,
             "temperature": temperature,
             "max_tokens": max_tokens
         }
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
-        
+    
+    def _error_message(self, response) -> str:
+        """Describe a non-200 response, including Groq's error message if present"""
+        error_msg = f"Groq API error: {response.status_code}"
         try:
-            response = requests.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=payload,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                error_msg = f"Groq API error: {response.status_code}"
-                try:
-                    error_detail = response.json()
-                    if 'error' in error_detail:
-                        error_msg += f" - {error_detail['error'].get('message', 'Unknown error')}"
-                except:
-                    error_msg += f" - {response.text}"
-                
-                self.logger.error(error_msg)
-                raise Exception(error_msg)
-                
-        except requests.exceptions.RequestException as e:
-            error_msg = f"Request failed: {str(e)}"
-            self.logger.error(error_msg)
-            raise Exception(error_msg)
+            error_detail = _loads(response.content)
+            if 'error' in error_detail:
+                error_msg += f" - {error_detail['error'].get('message', 'Unknown error')}"
+        except:
+            error_msg += f" - {response.text}"
+        return error_msg
     
     def simple_completion(self, prompt: str, system_prompt: str = None, **kwargs) -> str:
         """
@@ -95,6 +258,178 @@ class GroqClient:
         
         response = self.chat_completion(messages, **kwargs)
         return response['choices'][0]['message']['content'].strip()
+    
+    async def asimple_completion(self, prompt: str, system_prompt: str = None, **kwargs) -> str:
+        """Async version of simple_completion"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        response = await self.achat_completion(messages, **kwargs)
+        return response['choices'][0]['message']['content'].strip()
+    
+    def stream_completion(self, prompt: str, system_prompt: str = None,
+                          early_stop: Optional[Callable[[str], bool]] = None,
+                          model: str = "llama-3.1-8b-instant", temperature: float = 0.7,
+                          max_tokens: int = 1024) -> Iterator[str]:
+        """
+        Stream a completion, yielding content deltas as Groq sends them
+        
+        Args:
+            prompt: User prompt
+            system_prompt: Optional system prompt
+            early_stop: Optional check called with the text received so far;
+                        returning True closes the stream so no more tokens
+                        are generated
+            
+        Yields:
+            Text deltas in the order they arrive
+        """
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        body = _dumps(self._build_payload(messages, model, temperature, max_tokens, True))
+        self._check_breaker()
+        
+        # Opening the stream is retried like chat_completion; once tokens
+        # have been yielded a failure is raised to the caller
+        for attempt in range(MAX_RETRIES + 1):
+            response = None
+            try:
+                response = self.session.post(
+                    f"{self.base_url}/chat/completions",
+                    data=body,
+                    timeout=self.timeout,
+                    stream=True
+                )
+            except requests.exceptions.RequestException as e:
+                error_msg = f"Request failed: {str(e)}"
+            else:
+                if response.status_code == 200:
+                    self._consecutive_failures = 0
+                    break
+                error_msg = self._error_message(response)
+                response.close()
+                if response.status_code not in RETRY_STATUSES:
+                    self.logger.error(error_msg)
+                    raise Exception(error_msg)
+            
+            if attempt < MAX_RETRIES:
+                delay = self._retry_delay(attempt, response)
+                self.logger.warning("%s, retrying in %.2fs", error_msg, delay)
+                time.sleep(delay)
+        else:
+            self._record_transient_failure()
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+        
+        with response:
+            text = ""
+            # Server-sent events: one "data: {json}" line per chunk, ending
+            # with "data: [DONE]"
+            for line in response.iter_lines():
+                if not line.startswith(b"data: "):
+                    continue
+                data = line[6:]
+                if data == b"[DONE]":
+                    break
+                
+                delta = _loads(data)['choices'][0]['delta'].get('content')
+                if not delta:
+                    continue
+                text += delta
+                yield delta
+                
+                if early_stop is not None and early_stop(text):
+                    break
+    
+    async def astream_completion(self, prompt: str, system_prompt: str = None,
+                                 early_stop: Optional[Callable[[str], bool]] = None,
+                                 model: str = "llama-3.1-8b-instant", temperature: float = 0.7,
+                                 max_tokens: int = 1024) -> AsyncIterator[str]:
+        """Async version of stream_completion, over the pooled AsyncClient"""
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+        
+        body = _dumps(self._build_payload(messages, model, temperature, max_tokens, True))
+        self._check_breaker()
+        
+        client = self._get_async_client()
+        for attempt in range(MAX_RETRIES + 1):
+            response = None
+            try:
+                response = await client.send(
+                    client.build_request("POST", f"{self.base_url}/chat/completions", content=body),
+                    stream=True
+                )
+            except httpx.HTTPError as e:
+                error_msg = f"Request failed: {str(e) or type(e).__name__}"
+            else:
+                if response.status_code == 200:
+                    self._consecutive_failures = 0
+                    break
+                await response.aread()
+                await response.aclose()
+                error_msg = self._error_message(response)
+                if response.status_code not in RETRY_STATUSES:
+                    self.logger.error(error_msg)
+                    raise Exception(error_msg)
+            
+            if attempt < MAX_RETRIES:
+                delay = self._retry_delay(attempt, response)
+                self.logger.warning("%s, retrying in %.2fs", error_msg, delay)
+                await asyncio.sleep(delay)
+        else:
+            self._record_transient_failure()
+            self.logger.error(error_msg)
+            raise Exception(error_msg)
+        
+        try:
+            text = ""
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                data = line[6:]
+                if data == "[DONE]":
+                    break
+                
+                delta = _loads(data)['choices'][0]['delta'].get('content')
+                if not delta:
+                    continue
+                text += delta
+                yield delta
+                
+                if early_stop is not None and early_stop(text):
+                    break
+        finally:
+            await response.aclose()
+
+
+# One GroqClient shared by the draft generator and the reviewer, so both use
+# the same connection pools (sync and async) and the same circuit breaker
+_SHARED_CLIENT: Optional[GroqClient] = None
+_SHARED_CLIENT_LOCK = threading.Lock()
+
+
+def get_groq_client() -> GroqClient:
+    """Return the shared GroqClient, creating it on first use"""
+    global _SHARED_CLIENT
+    if _SHARED_CLIENT is None:
+        with _SHARED_CLIENT_LOCK:
+            if _SHARED_CLIENT is None:
+                _SHARED_CLIENT = GroqClient()
+    return _SHARED_CLIENT
+
+
+async def aclose_groq_client():
+    """Close the shared client's async connections, if it was ever created"""
+    if _SHARED_CLIENT is not None:
+        await _SHARED_CLIENT.aclose()
 
 
 # Test function
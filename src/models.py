@@ -2,11 +2,21 @@
 Data models for the Support Ticket Resolution Agent
 """
 
+import itertools
+import sys
 from dataclasses import dataclass, field
 from datetime import datetime
 from typing import Dict, List, Optional, TypedDict
 from enum import Enum
 
+# dataclass(slots=True) needs Python 3.10+; older versions get regular
+# (still frozen) dataclasses
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# Per-process sequence number appended to generated ticket IDs, so tickets
+# created within the same second still get distinct IDs
+_TICKET_COUNTER = itertools.count(1)
+
 
 class TicketCategory(Enum):
     """Predefined ticket categories"""
@@ -16,7 +26,7 @@ class TicketCategory(Enum):
     GENERAL = "general"
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class SupportTicket:
     """
     Represents an incoming support ticket - this is our input data structure.
@@ -32,7 +42,14 @@ class SupportTicket:
     def __post_init__(self):
         """Generate ticket ID if not provided"""
         if self.ticket_id is None:
-            self.ticket_id = f"TKT-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+            # Frozen dataclass, so set the generated ID through object. The ID
+            # comes from the ticket's own timestamp rather than a second clock read
+            ts = self.timestamp
+            object.__setattr__(
+                self, "ticket_id",
+                f"TKT-{ts.year:04d}{ts.month:02d}{ts.day:02d}-{ts.hour:02d}{ts.minute:02d}{ts.second:02d}"
+                f"-{next(_TICKET_COUNTER):06d}"
+            )
     
     def to_dict(self) -> Dict:
         """Convert to dictionary for JSON serialization"""
@@ -59,7 +76,7 @@ class SupportTicket:
         )
 
 
-@dataclass
+@dataclass(frozen=True, **_SLOTS)
 class ReviewResult:
     """Result from the draft reviewer"""
     approved: bool
@@ -101,16 +118,20 @@ def validate_ticket_input(subject: str, description: str) -> tuple[bool, str]:
     Validate input ticket data before processing.
     Returns (is_valid, error_message)
     """
-    if not subject or not subject.strip():
+    # Strip each field once and reuse the lengths below
+    subject_length = len(subject.strip()) if subject else 0
+    description_length = len(description.strip()) if description else 0
+    
+    if not subject_length:
         return False, "Subject cannot be empty"
     
-    if not description or not description.strip():
+    if not description_length:
         return False, "Description cannot be empty"
     
-    if len(subject.strip()) < 3:
+    if subject_length < 3:
         return False, "Subject must be at least 3 characters long"
     
-    if len(description.strip()) < 10:
+    if description_length < 10:
         return False, "Description must be at least 10 characters long"
     
     if len(subject) > 200:
@@ -132,10 +153,15 @@ def create_initial_state(subject: str, description: str, **kwargs) -> AgentState
     if not is_valid:
         raise ValueError(f"Invalid ticket input: {error_message}")
     
+    # One clock read for the ticket timestamp, its ID and the start time
+    now = datetime.now()
+    now_iso = now.isoformat()
+    
     # Create the support ticket
     ticket = SupportTicket(
         subject=subject.strip(),
         description=description.strip(),
+        timestamp=now,
         priority=kwargs.get('priority', 'normal'),
         customer_id=kwargs.get('customer_id')
     )
@@ -152,11 +178,11 @@ def create_initial_state(subject: str, description: str, **kwargs) -> AgentState
         "escalated": False,
         "final_response": None,
         "processing_log": [
-            f"Ticket {ticket.ticket_id} created at {ticket.timestamp.isoformat()}",
+            f"Ticket {ticket.ticket_id} created at {now_iso}",
             f"Subject: {ticket.subject}",
             f"Priority: {ticket.priority}"
         ],
-        "processing_start_time": datetime.now().isoformat(),
+        "processing_start_time": now_iso,
         "processing_end_time": None
     }
     
@@ -1,4 +1,6 @@
 # src/rag_retrieval.py
+import heapq
+from operator import itemgetter
 from typing import List, Dict
 import logging
 
@@ -82,60 +84,73 @@ class RAGRetriever:
     def __init__(self):
         self.knowledge_base = KNOWLEDGE_BASE
         self.logger = logging.getLogger(__name__)
+        
+        # The knowledge base is static, so each document's word set is built
+        # once here instead of on every query
+        self._doc_index = {
+            category: [
+                (doc, frozenset(f"{doc['title']} {doc['content']}".lower().split()))
+                for doc in docs
+            ]
+            for category, docs in self.knowledge_base.items()
+        }
     
     def retrieve_context(self, classification: str, subject: str, description: str, 
                         reviewer_feedback: str = None, attempt: int = 1) -> List[Dict]:
        
-        self.logger.info(f"Retrieving context for category: {classification}, attempt: {attempt}")
+        self.logger.info("Retrieving context for category: %s, attempt: %s", classification, attempt)
         
         
-        category = classification.lower()
-        if category not in self.knowledge_base:
-            self.logger.warning(f"Unknown category: {category}, defaulting to general")
+        # Classifier output is already lowercase; only lower() other spellings
+        category = classification if classification in self._doc_index else classification.lower()
+        category_docs = self._doc_index.get(category)
+        if category_docs is None:
+            self.logger.warning("Unknown category: %s, defaulting to general", category)
             category = "general"
+            category_docs = self._doc_index[category]
         
-       
-        query_text = f"{subject} {description}".lower()
-        if reviewer_feedback:
-            query_text += f" {reviewer_feedback}".lower()
-        
-       
-        category_docs = self.knowledge_base[category]
-        
-        
-        scored_docs = []
-        query_words = set(query_text.split())
-        
-        for doc in category_docs:
-            
-            doc_text = f"{doc['title']} {doc['content']}".lower()
-            doc_words = set(doc_text.split())
-            
-            
-            overlap = len(query_words.intersection(doc_words))
-            total_query_words = len(query_words)
-            score = overlap / total_query_words if total_query_words > 0 else 0
-            
-            scored_docs.append((doc, score))
-        
-        
-        scored_docs.sort(key=lambda x: x[1], reverse=True)
+        # The final attempt uses every document in the category, so there is
+        # nothing to rank
+        if attempt >= 3:
+            selected_docs = [doc for doc, _ in category_docs]
+            self.logger.info("Retrieved %d documents for %s", len(selected_docs), category)
+            return selected_docs
         
+        # Build the query in one string and lowercase it once
+        if reviewer_feedback:
+            query_text = f"{subject} {description} {reviewer_feedback}".lower()
+        else:
+            query_text = f"{subject} {description}".lower()
+
+        query_words = frozenset(query_text.split())
+        total_query_words = len(query_words) or 1
+
+        # Empty queries score 0 for every document
+        scored_docs = [
+            (doc, len(query_words & doc_words) / total_query_words)
+            for doc, doc_words in category_docs
+        ]
+
         
         if attempt == 1:
             
             num_docs = 2
-        elif attempt == 2:
+        else:
             
             num_docs = 3
+        
+        # Only the top few are needed, so select them
+        # instead of sorting everything (nlargest keeps ties in KB order,
+        # like the stable sort)
+        if num_docs < len(scored_docs):
+            top_docs = heapq.nlargest(num_docs, scored_docs, key=itemgetter(1))
         else:
-            
-            num_docs = len(scored_docs)
+            top_docs = sorted(scored_docs, key=itemgetter(1), reverse=True)
         
        
-        selected_docs = [doc for doc, score in scored_docs[:num_docs]]
+        selected_docs = [doc for doc, score in top_docs]
         
-        self.logger.info(f"Retrieved {len(selected_docs)} documents for {category}")
+        self.logger.info("Retrieved %d documents for %s", len(selected_docs), category)
         return selected_docs
     
     def format_context_for_prompt(self, documents: List[Dict]) -> str:
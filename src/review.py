@@ -1,49 +1,165 @@
 # src/review.py
+import os
+import re
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Tuple
-from .groq_client import GroqClient
+import sqlite3
+import threading
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import Dict, Optional, Tuple
+from .draft import acache_approved_draft, cache_approved_draft
+from .groq_client import get_groq_client
+
+try:
+    import diskcache
+except ImportError:
+    diskcache = None
+
+logger = logging.getLogger(__name__)
+
+# Groq settings for review calls
+_REVIEW_PARAMS = {
+    "model": "llama-3.1-8b-instant",
+    "temperature": 0.1
+}
+
+# A review is one DECISION line plus a short FEEDBACK paragraph, so the
+# completion is capped well below the draft's. Billing and security feedback
+# tends to cite more policy points and gets a little more room.
+_REVIEW_MAX_TOKENS = {
+    "billing": 180,
+    "security": 180,
+    "technical": 100,
+    "general": 100
+}
+
+_REVIEW_ERROR_FEEDBACK = "Unable to complete review due to technical issues. Please revise the response to be more helpful and accurate."
+
+# Approvals keyed by a hash of the prompts sent to Groq, so re-reviewing an
+# approved draft for the same ticket and attempt skips the LLM call.
+# Rejections are never cached: a ticket sent again unchanged gets a fresh
+# review instead of replaying the old verdict. Set REVIEW_CACHE_ENABLED=0 to
+# always call Groq.
+REVIEW_CACHE_ENABLED = os.getenv("REVIEW_CACHE_ENABLED", "1") != "0"
+REVIEW_CACHE_SIZE = 1024
+_review_cache: "OrderedDict[str, Tuple[bool, str]]" = OrderedDict()
+_review_cache_lock = threading.Lock()
+
+# Reviews can also be persisted on disk (when diskcache is installed), so a
+# rerun of the same tickets and drafts, e.g. main.py --batch, needs no review
+# calls at all. Set REVIEW_CACHE_DIR to a directory to enable it; the cache
+# is opened on first use, and an unusable directory leaves the cache in
+# memory only. Stored reviews expire after REVIEW_CACHE_TTL seconds, so a
+# bad review is not replayed forever.
+REVIEW_CACHE_DIR = os.path.expanduser(os.getenv("REVIEW_CACHE_DIR", ""))
+REVIEW_CACHE_TTL = int(os.getenv("REVIEW_CACHE_TTL", "86400"))
+_review_disk_cache = None
+_review_disk_cache_enabled = diskcache is not None and REVIEW_CACHE_ENABLED and bool(REVIEW_CACHE_DIR)
+_review_disk_cache_lock = threading.Lock()
+
+
+def _get_review_disk_cache():
+    """Return the on-disk review cache, opening it on first use, or None"""
+    global _review_disk_cache, _review_disk_cache_enabled
+    if _review_disk_cache is None and _review_disk_cache_enabled:
+        with _review_disk_cache_lock:
+            if _review_disk_cache is None and _review_disk_cache_enabled:
+                try:
+                    _review_disk_cache = diskcache.Cache(REVIEW_CACHE_DIR, size_limit=int(1e8))
+                except (OSError, sqlite3.Error) as e:
+                    logger.warning("Review disk cache unavailable at %s, keeping reviews in memory only: %s",
+                                   REVIEW_CACHE_DIR, e)
+                    _review_disk_cache_enabled = False
+    return _review_disk_cache
+
+
+def _review_cache_key(system_prompt: str, review_prompt: str) -> str:
+    key_text = f"{system_prompt}\x1f{review_prompt}\x1f{_REVIEW_PARAMS['model']}\x1f{_REVIEW_PARAMS['temperature']}"
+    return hashlib.sha1(key_text.encode("utf-8")).hexdigest()
 
-class DraftReviewer:
-    def __init__(self):
-        self.client = GroqClient()
-        self.logger = logging.getLogger(__name__)
-    
-    def review_draft(self, subject: str, description: str, classification: str, 
-                    draft_response: str, attempt: int = 1) -> Tuple[bool, str]:
-    
-        self.logger.info(f"Reviewing draft for {classification} ticket, attempt {attempt}")
-        
-        # Get category-specific review criteria
-        review_prompt = self._build_review_prompt(
-            subject, description, classification, draft_response, attempt
-        )
-        
-        system_prompt = self._get_reviewer_system_prompt(classification)
-        
-        try:
-            review_result = self.client.simple_completion(
-                prompt=review_prompt,
-                system_prompt=system_prompt,
-                model="llama-3.1-8b-instant",
-                temperature=0.1,  
-                max_tokens=300
-            )
-            
-            # Parse the review result
-            approved, feedback = self._parse_review_result(review_result)
-            
-            self.logger.info(f"Review completed: {'APPROVED' if approved else 'REJECTED'}")
-            return approved, feedback
-            
-        except Exception as e:
-            self.logger.error(f"Error during review: {str(e)}")
-            # Default to rejection with generic feedback on error
-            return False, "Unable to complete review due to technical issues. Please revise the response to be more helpful and accurate."
-    
-    def _get_reviewer_system_prompt(self, classification: str) -> str:
-        """Get category-specific reviewer system prompt"""
 
-        base_prompt = """You are an MODERATELY STRICT customer support quality assurance reviewer with VERY HIGH STANDARDS.
+def _get_memory_review(key: str) -> Optional[Tuple[bool, str]]:
+    with _review_cache_lock:
+        review = _review_cache.get(key)
+        if review is not None:
+            _review_cache.move_to_end(key)
+        return review
+
+
+def _get_disk_review(key: str) -> Optional[Tuple[bool, str]]:
+    disk_cache = _get_review_disk_cache()
+    if disk_cache is None:
+        return None
+    try:
+        review = disk_cache.get(key)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Review disk cache read failed: %s", e)
+        return None
+    if review is not None:
+        _remember_review(key, review)
+    return review
+
+
+def _get_cached_review(key: str) -> Optional[Tuple[bool, str]]:
+    if not REVIEW_CACHE_ENABLED:
+        return None
+    review = _get_memory_review(key)
+    if review is None:
+        review = _get_disk_review(key)
+    return review
+
+
+async def _aget_cached_review(key: str) -> Optional[Tuple[bool, str]]:
+    """Async version of _get_cached_review; disk reads run off the event loop"""
+    if not REVIEW_CACHE_ENABLED:
+        return None
+    review = _get_memory_review(key)
+    if review is None and _review_disk_cache_enabled:
+        review = await asyncio.to_thread(_get_disk_review, key)
+    return review
+
+
+def _remember_review(key: str, review: Tuple[bool, str]) -> None:
+    with _review_cache_lock:
+        _review_cache[key] = review
+        _review_cache.move_to_end(key)
+        if len(_review_cache) > REVIEW_CACHE_SIZE:
+            _review_cache.popitem(last=False)
+
+
+def _store_disk_review(key: str, review: Tuple[bool, str]) -> None:
+    disk_cache = _get_review_disk_cache()
+    if disk_cache is None:
+        return
+    try:
+        disk_cache.set(key, review, expire=REVIEW_CACHE_TTL)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning("Review disk cache write failed: %s", e)
+
+
+def _cache_review(key: str, review: Tuple[bool, str]) -> None:
+    approved, _ = review
+    if not REVIEW_CACHE_ENABLED or not approved:
+        return
+    _remember_review(key, review)
+    _store_disk_review(key, review)
+
+
+async def _acache_review(key: str, review: Tuple[bool, str]) -> None:
+    """Async version of _cache_review; disk writes run off the event loop"""
+    approved, _ = review
+    if not REVIEW_CACHE_ENABLED or not approved:
+        return
+    _remember_review(key, review)
+    if _review_disk_cache_enabled:
+        await asyncio.to_thread(_store_disk_review, key, review)
+
+
+# The reviewer's system prompts are static, so the base criteria are joined
+# with each category's policies once at import time instead of on every review
+_REVIEWER_BASE_PROMPT = """You are an MODERATELY STRICT customer support quality assurance reviewer with VERY HIGH STANDARDS.
 
 STRICT REJECTION CRITERIA (REJECT if ANY are missing):
 1. EMPATHY: Must genuinely acknowledge customer frustration with specific empathetic language (not just "I understand")
@@ -61,11 +177,8 @@ IMPORTANT: You must respond in this exact format:
 DECISION: [APPROVED/REJECTED]
 FEEDBACK: [Your specific, detailed feedback about what needs to be improved]"""
 
-        
-
-
-        category_specific = {
-            "billing": """
+_REVIEWER_CATEGORY_POLICIES = {
+    "billing": """
 
 BILLING-SPECIFIC POLICIES:
 - Never guarantee refunds without proper authorization
@@ -74,7 +187,7 @@ BILLING-SPECIFIC POLICIES:
 - Be clear about billing cycles and processing times
 - Don't make promises about waiving fees""",
 
-            "technical": """
+    "technical": """
 
 TECHNICAL-SPECIFIC POLICIES:
 - Provide step-by-step troubleshooting when possible
@@ -83,7 +196,7 @@ TECHNICAL-SPECIFIC POLICIES:
 - Suggest escalation to technical team for complex issues
 - Include browser/device compatibility information when relevant""",
 
-            "security": """
+    "security": """
 
 SECURITY-SPECIFIC POLICIES:
 - Take all security concerns seriously
@@ -92,16 +205,163 @@ SECURITY-SPECIFIC POLICIES:
 - Escalate suspicious activity to security team immediately
 - Be clear about security timelines and processes""",
 
-            "general": """
+    "general": """
 
 GENERAL SUPPORT POLICIES:
 - Provide helpful information about our services
 - Direct users to appropriate teams when needed
 - Be patient with questions and provide clear guidance
 - Offer additional help and follow-up options"""
-        }
+}
+
+# Read-only views, since every DraftReviewer shares them
+_REVIEWER_SYSTEM_PROMPTS = MappingProxyType({
+    category: _REVIEWER_BASE_PROMPT + policies
+    for category, policies in _REVIEWER_CATEGORY_POLICIES.items()
+})
+
+_REVIEW_COMPLETION_PARAMS = MappingProxyType({
+    category: {**_REVIEW_PARAMS, "max_tokens": max_tokens}
+    for category, max_tokens in _REVIEW_MAX_TOKENS.items()
+})
+
+
+def _review_category(classification: str) -> str:
+    """Normalize a classification to a reviewer category, defaulting to general"""
+    # The classifier already emits lowercase category values, so only other
+    # spellings pay for lower()
+    if classification in _REVIEWER_SYSTEM_PROMPTS:
+        return classification
+    category = classification.lower()
+    return category if category in _REVIEWER_SYSTEM_PROMPTS else "general"
+
+
+# Replies to placeholder tickets like "Test" or "Help", which the reviewer
+# prompt says to ALWAYS REJECT, are rejected locally without a Groq call.
+# Only the description decides: a real ticket with a terse subject such as
+# "Help!" still goes to the LLM reviewer. Set REVIEW_PREFILTER_ENABLED=0 to
+# send every draft to the LLM reviewer.
+REVIEW_PREFILTER_ENABLED = os.getenv("REVIEW_PREFILTER_ENABLED", "1") != "0"
+_TRIVIAL_TICKET_RE = re.compile(r"^\s*(test|help|hi|hello)\s*[.!?]*\s*$", re.IGNORECASE)
+
+
+def _prefilter_rejection(description: str) -> Optional[str]:
+    """Feedback for a draft that is rejected without calling Groq, or None"""
+    if REVIEW_PREFILTER_ENABLED and _TRIVIAL_TICKET_RE.match(description):
+        return "The ticket is too short or vague to resolve automatically."
+    return None
+
+
+def _approval_received(text: str) -> bool:
+    """
+    Early-stop check for the streamed review: True once a complete DECISION
+    line approving the draft has arrived. Approved drafts need no feedback,
+    so the rest of the response is not generated; rejections keep streaming
+    so their feedback comes through.
+    """
+    start = text.find("DECISION:")
+    if start < 0:
+        return False
+    end = text.find("\n", start)
+    return end >= 0 and "APPROVED" in text[start:end].upper()
+
+class DraftReviewer:
+    def __init__(self):
+        self.client = get_groq_client()
+        self.logger = logging.getLogger(__name__)
+    
+    def review_draft(self, subject: str, description: str, classification: str, 
+                    draft_response: str, attempt: int = 1) -> Tuple[bool, str]:
+    
+        self.logger.info("Reviewing draft for %s ticket, attempt %s", classification, attempt)
+        
+        prefilter_feedback = _prefilter_rejection(description)
+        if prefilter_feedback is not None:
+            self.logger.info("Review completed: REJECTED (prefilter)")
+            return False, prefilter_feedback
+        
+        # Get category-specific review criteria
+        system_prompt, review_prompt, params, cache_key = self._prepare_prompts(
+            subject, description, classification, draft_response, attempt
+        )
         
-        return base_prompt + category_specific.get(classification.lower(), category_specific["general"])
+        cached_review = _get_cached_review(cache_key)
+        if cached_review is not None:
+            self.logger.info("Returning cached review")
+            return cached_review
+        
+        try:
+            review_result = "".join(self.client.stream_completion(
+                prompt=review_prompt,
+                system_prompt=system_prompt,
+                early_stop=_approval_received,
+                **params
+            ))
+            
+            # Parse the review result
+            approved, feedback = self._parse_review_result(review_result)
+            
+            self.logger.info("Review completed: %s", 'APPROVED' if approved else 'REJECTED')
+            # Only real LLM approvals are cached, never rejections or the
+            # error fallback
+            _cache_review(cache_key, (approved, feedback))
+            return approved, feedback
+            
+        except Exception as e:
+            self.logger.error("Error during review: %s", e)
+            # Default to rejection with generic feedback on error
+            return False, _REVIEW_ERROR_FEEDBACK
+    
+    async def areview_draft(self, subject: str, description: str, classification: str,
+                            draft_response: str, attempt: int = 1) -> Tuple[bool, str]:
+        """Async version of review_draft, awaiting Groq on the event loop"""
+        self.logger.info("Reviewing draft for %s ticket, attempt %s", classification, attempt)
+        
+        prefilter_feedback = _prefilter_rejection(description)
+        if prefilter_feedback is not None:
+            self.logger.info("Review completed: REJECTED (prefilter)")
+            return False, prefilter_feedback
+        
+        system_prompt, review_prompt, params, cache_key = self._prepare_prompts(
+            subject, description, classification, draft_response, attempt
+        )
+        
+        cached_review = await _aget_cached_review(cache_key)
+        if cached_review is not None:
+            self.logger.info("Returning cached review")
+            return cached_review
+        
+        try:
+            review_result = "".join([
+                delta async for delta in self.client.astream_completion(
+                    prompt=review_prompt,
+                    system_prompt=system_prompt,
+                    early_stop=_approval_received,
+                    **params
+                )
+            ])
+            
+            approved, feedback = self._parse_review_result(review_result)
+            
+            self.logger.info("Review completed: %s", 'APPROVED' if approved else 'REJECTED')
+            await _acache_review(cache_key, (approved, feedback))
+            return approved, feedback
+            
+        except Exception as e:
+            self.logger.error("Error during review: %s", e)
+            return False, _REVIEW_ERROR_FEEDBACK
+    
+    def _prepare_prompts(self, subject: str, description: str, classification: str,
+                         draft_response: str, attempt: int):
+        """Build the reviewer prompts, Groq settings and review cache key for a draft"""
+        # The category is normalized once and indexes both tables
+        category = _review_category(classification)
+        system_prompt = _REVIEWER_SYSTEM_PROMPTS[category]
+        review_prompt = self._build_review_prompt(
+            subject, description, classification, draft_response, attempt
+        )
+        params = _REVIEW_COMPLETION_PARAMS[category]
+        return system_prompt, review_prompt, params, _review_cache_key(system_prompt, review_prompt)
     
     def _build_review_prompt(self, subject: str, description: str, classification: str, 
                            draft_response: str, attempt: int) -> str:
@@ -139,10 +399,10 @@ Please provide your evaluation in the required format."""
         for line in lines:
             line = line.strip()
             if line.startswith("DECISION:"):
-                decision_line = line.replace("DECISION:", "").strip()
+                decision_line = line[9:].strip()  # drop the "DECISION:" prefix
                 found_decision = True
             elif line.startswith("FEEDBACK:"):
-                feedback_lines.append(line.replace("FEEDBACK:", "").strip())
+                feedback_lines.append(line[9:].strip())  # drop the "FEEDBACK:" prefix
                 found_feedback = True
             elif found_feedback:
                 # Continue collecting feedback lines
@@ -164,15 +424,52 @@ Please provide your evaluation in the required format."""
         return approved, feedback
 
 
+# One DraftReviewer shared by every review node call
+_REVIEWER: Optional[DraftReviewer] = None
+_REVIEWER_LOCK = threading.Lock()
+
+
+def get_draft_reviewer() -> DraftReviewer:
+    """Return the shared DraftReviewer, creating it on first use"""
+    global _REVIEWER
+    if _REVIEWER is None:
+        with _REVIEWER_LOCK:
+            if _REVIEWER is None:
+                _REVIEWER = DraftReviewer()
+    return _REVIEWER
+
+
+def _prefilter_update(state: Dict, attempt: int) -> Optional[Dict]:
+    """
+    Review node update for a placeholder ticket, or None. Redrafting cannot
+    fix the ticket itself, so it is marked for escalation right away instead
+    of going through the retries.
+    """
+    feedback = _prefilter_rejection(state['description'])
+    if feedback is None:
+        return None
+    logger.info("Review completed: REJECTED (prefilter), escalating")
+    return {
+        "review_passed": False,
+        "reviewer_feedback": feedback,
+        "draft_attempt": attempt,
+        "max_attempts_reached": True
+    }
+
+
 def review_node(state: Dict) -> Dict:
     """
     LangGraph node function for draft review
     """
-    reviewer = DraftReviewer()
+    reviewer = get_draft_reviewer()
     
     # Get current attempt number
     attempt = state.get('draft_attempt', 1)
     
+    prefilter_update = _prefilter_update(state, attempt)
+    if prefilter_update is not None:
+        return prefilter_update
+    
     # Review the draft
     approved, feedback = reviewer.review_draft(
         subject=state['subject'],
@@ -182,6 +479,41 @@ def review_node(state: Dict) -> Dict:
         attempt=attempt
     )
     
+    # Only approved drafts are worth serving again for the same ticket
+    if approved:
+        cache_approved_draft(state['draft_response'])
+    
+    return {
+        "review_passed": approved,
+        "reviewer_feedback": feedback,
+        "draft_attempt": attempt
+    }
+
+
+async def areview_node(state: Dict) -> Dict:
+    """
+    Async LangGraph node function for draft review, used by ainvoke/abatch
+    """
+    reviewer = get_draft_reviewer()
+    
+    attempt = state.get('draft_attempt', 1)
+    
+    prefilter_update = _prefilter_update(state, attempt)
+    if prefilter_update is not None:
+        return prefilter_update
+    
+    approved, feedback = await reviewer.areview_draft(
+        subject=state['subject'],
+        description=state['description'],
+        classification=state['classification'],
+        draft_response=state['draft_response'],
+        attempt=attempt
+    )
+    
+    # Only approved drafts are worth serving again for the same ticket
+    if approved:
+        await acache_approved_draft(state['draft_response'])
+    
     return {
         "review_passed": approved,
         "reviewer_feedback": feedback,
@@ -24,4 +24,25 @@ class SupportTicketState(TypedDict):
     
    
     escalated: Optional[bool]
-    max_attempts_reached: Optional[bool]
\ No newline at end of file
+    max_attempts_reached: Optional[bool]
+    escalation_message: Optional[str]
+
+
+# Every field except the ticket text starts from the same values, so entry
+# points build the dict once and copy it per ticket. All values are
+# immutable, so a shallow copy is enough.
+INITIAL_STATE_TEMPLATE: SupportTicketState = {
+    "subject": "",
+    "description": "",
+    "classification": None,
+    "retrieved_context": None,
+    "formatted_context": None,
+    "retrieval_attempt": 1,
+    "draft_response": None,
+    "review_passed": None,
+    "reviewer_feedback": None,
+    "draft_attempt": 1,
+    "max_attempts_reached": None,
+    "escalated": None,
+    "escalation_message": None,
+}